@@ -0,0 +1,167 @@
+"""Throughput and latency benchmarks for the dancer logging stack.
+
+Every logger mode runs in its own interpreter, because ActLogger and IOManager are singletons.
+The results are printed (or written with --output) as a JSON list, one entry per scenario and mode, e.g.
+{"mode": "async", "scenario": "actlogger.log", "threads": 4, "calls": 80000, "calls_per_s": ...,
+"records_per_s": ..., "p50_us": ..., "p99_us": ...}.
+
+    python benchmarks/bench_logging.py --modes sync async --threads 1 4 --output bench_output.txt
+"""
+from argparse import ArgumentParser as _Ag, SUPPRESS as _SUPPRESS
+import subprocess
+import threading
+import tempfile
+import shutil
+import logging
+import json
+import time
+import sys
+import os
+
+import typing as _ty
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+MODES: dict[str, dict[str, _ty.Any]] = {
+    "sync": {},
+    "async": {"async_mode": True},
+    "buffered": {"file_buffer_size": 1 << 16},
+    "async_buffered": {"async_mode": True, "file_buffer_size": 1 << 16},
+    "jsonl": {"log_format": "jsonl", "file_buffer_size": 1 << 16},
+    "binary": {"log_format": "binary", "file_buffer_size": 1 << 16},
+}
+
+# Shapes of the writes that get passed to _StreamToLogger.write
+STREAM_SHAPES: dict[str, str] = {
+    "short_line": "short line of output\n",
+    "long_line": "x" * 2000 + "\n",
+    "many_lines": "line\n" * 100,
+    "partial": "partial ",
+}
+
+
+def _percentile(sorted_values: list[int], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(int(len(sorted_values) * fraction), len(sorted_values) - 1)] / 1000
+
+
+def _measure(call: _ty.Callable[[int], None], calls: int, threads: int, flush: _ty.Callable[[], None],
+             records_per_call: int = 1) -> dict[str, _ty.Any]:
+    """Runs call(i) calls times on every thread and measures each call."""
+    latencies: list[list[int]] = [[0] * calls for _ in range(threads)]
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(thread_index: int) -> None:
+        timings: list[int] = latencies[thread_index]
+        clock = time.perf_counter_ns
+        barrier.wait()
+        for i in range(calls):
+            start: int = clock()
+            call(i)
+            timings[i] = clock() - start
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for thread in workers:
+        thread.start()
+    barrier.wait()
+    start: float = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    call_time: float = time.perf_counter() - start
+    flush()
+    total_time: float = time.perf_counter() - start
+
+    merged: list[int] = sorted(value for timings in latencies for value in timings)
+    total_calls: int = calls * threads
+    return {"threads": threads, "calls": total_calls,
+            "calls_per_s": round(total_calls / call_time, 1),
+            "records_per_s": round(total_calls * records_per_call / total_time, 1),
+            "p50_us": round(_percentile(merged, 0.50), 3), "p99_us": round(_percentile(merged, 0.99), 3),
+            "max_us": round(merged[-1] / 1000, 3) if merged else 0.0}
+
+
+def run_mode(mode: str, thread_counts: list[int], calls: int, console: bool) -> list[dict[str, _ty.Any]]:
+    """Runs all scenarios for one logger mode in this interpreter."""
+    from dancer.io import IOManager, ActLogger
+
+    logs_dir: str = tempfile.mkdtemp(prefix="dancer_bench_")
+    try:
+        original_stdout, original_stderr = sys.stdout, sys.stderr
+        io_manager: IOManager = IOManager()
+        io_manager.init(lambda *_: ("Ok", False), logs_dir, True, MODES[mode])
+        sys.stdout, sys.stderr = original_stdout, original_stderr  # init() redirects them, we only want the results
+        logger: ActLogger = ActLogger()
+        if not console:
+            logger.handlers[0].setLevel(logging.CRITICAL + 1)  # The console handler
+        io_manager.set_logging_level(logging.DEBUG)
+
+        results: list[dict[str, _ty.Any]] = []
+
+        def record(scenario: str, result: dict[str, _ty.Any]) -> None:
+            results.append({"mode": mode, "scenario": scenario, **result})
+
+        def drain_prompts() -> None:
+            while io_manager.has_cached_errors():
+                io_manager.invoke_prompts()
+
+        for threads in thread_counts:
+            record("actlogger.log", _measure(lambda i: logger.log(logging.INFO, "benchmark record %d", i),
+                                             calls, threads, logger.flush))
+            record("actlogger.debug_disabled", _measure(lambda i: logger.log(logging.NOTSET + 1, "hidden %d", i),
+                                                        calls, threads, logger.flush, 0))
+            for shape, text in STREAM_SHAPES.items():
+                stream = logger.create_pipe_redirect(original_stdout, level=logging.INFO)
+                record(f"stream.write.{shape}", _measure(lambda _: stream.write(text), calls, threads,
+                                                         lambda: (stream.flush(), logger.flush()),
+                                                         text.count("\n")))
+            record("iomanager.info", _measure(lambda i: io_manager.info("benchmark info %d", args=(i,)),
+                                              calls, threads, logger.flush))
+            record("iomanager.error", _measure(lambda i: io_manager.error("benchmark error %d", args=(i,)),
+                                               calls, threads, logger.flush))
+            record("iomanager.info.prompt", _measure(lambda i: io_manager.info("benchmark info %d", args=(i,),
+                                                                               show_prompt=True),
+                                                     calls, threads, logger.flush))
+            drain_prompts()
+            record("iomanager.error.prompt", _measure(lambda i: io_manager.error("benchmark error %d", args=(i,),
+                                                                                 show_prompt=True),
+                                                      calls, threads, logger.flush))
+            drain_prompts()
+        logger.close()
+        return results
+    finally:
+        shutil.rmtree(logs_dir, ignore_errors=True)
+
+
+def main() -> None:
+    parser = _Ag(description="Benchmarks the dancer logging stack")
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    parser.add_argument("--threads", nargs="+", type=int, default=[1, 4])
+    parser.add_argument("--calls", type=int, default=20000, help="Calls per thread and scenario")
+    parser.add_argument("--console", action="store_true", help="Also write the records to the console")
+    parser.add_argument("--output", type=str, default=None, help="File to write the JSON results to")
+    parser.add_argument("--in-process", type=str, default=None, help=_SUPPRESS)  # Runs a single mode
+    args = parser.parse_args()
+
+    if args.in_process is not None:
+        json.dump(run_mode(args.in_process, args.threads, args.calls, args.console), sys.__stdout__)
+        return
+
+    results: list[dict[str, _ty.Any]] = []
+    for mode in args.modes:
+        command: list[str] = [sys.executable, os.path.abspath(__file__), "--in-process", mode,
+                              "--calls", str(args.calls), "--threads", *map(str, args.threads)]
+        if args.console:
+            command.append("--console")
+        completed = subprocess.run(command, capture_output=True, text=True, check=True)
+        results.extend(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    output: str = json.dumps(results, indent=2)
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
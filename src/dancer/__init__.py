@@ -2,21 +2,26 @@
 from packaging.version import Version as _Version, InvalidVersion as _InvalidVersion
 from argparse import ArgumentParser as _Ag, Namespace as _Ns
 from dataclasses import dataclass as _dataclass
-from traceback import format_exc as _format_exc
+from traceback import format_exc as _format_exc, format_exception as _format_exception
+from collections import deque as _deque
+import threading
 import requests
 import logging
 import time
 import sys
 import os
 
-from . import config, io
+from . import config, io, concurrency
 from .io import IOManager, ActLogger, get_system, SystemTheme, BaseSystemType
+from .concurrency import (TaskHandle, CollectionStats, DynamicThreadPoolExecutor, create_process_pool, run_process_task,
+                          resolve_shared_memory, AsyncioLoopThread)
+from concurrent.futures import Future as _Future, ProcessPoolExecutor as _ProcessPoolExecutor
 
 from collections import abc as _a
 import typing as _ty
 
 
-__all__ = ["config", "io", "start", "Frontend", "UpdateResult", "UpdateChecker", "MainClass", "DefaultApp", "DefaultAppTUI", "DefaultServerTUI", "DefaultAppGUI"]
+__all__ = ["config", "io", "concurrency", "start", "Frontend", "UpdateResult", "UpdateChecker", "MainClass", "DefaultApp", "DefaultAppTUI", "DefaultServerTUI", "DefaultAppGUI"]
 __version__ = "0.0.0.1a1"
 
 
@@ -238,19 +243,52 @@ class MainClass(_ty.Protocol):
         raise NotImplementedError()
 
 class DefaultApp(MainClass):
+    # Keyword arguments passed on to the ActLogger, e.g. {"async_mode": True}
+    LOGGER_OPTIONS: dict[str, _ty.Any] = {}
+    # Opt-in: reload the namespace levels of the ActLogger from config/log_levels.json when the file changes and on
+    # SIGUSR1, if no other handler is installed for it
+    RELOAD_LOG_LEVELS: bool = False
+    LOG_LEVELS_POLL_INTERVAL: float = 2.0
+    # Limits of the thread pool used by offload_work, idle workers above the minimum retire after the timeout
+    POOL_MIN_WORKERS: int = 0
+    POOL_MAX_WORKERS: int = min(32, (os.cpu_count() or 1) + 4)
+    POOL_IDLE_TIMEOUT: float = 1.0
+    # Process pool used by offload_work(..., executor="process"). With PROCESS_POOL_START_EARLY it is started in
+    # __init__ so the first task does not wait for the workers to spawn, set PROCESS_POOL_WORKERS to 0 for apps
+    # that do not use it. Otherwise it is created on first use. Its workers import the PROCESS_POOL_PRELOAD modules
+    # when they start and bytes-like results of at least SHARED_MEMORY_THRESHOLD bytes are returned through
+    # shared memory.
+    PROCESS_POOL_WORKERS: int = os.cpu_count() or 1
+    PROCESS_POOL_PRELOAD: tuple[str, ...] = ()
+    PROCESS_POOL_START_EARLY: bool = True
+    PROCESS_POOL_START_METHOD: str | None = "spawn"
+    SHARED_MEMORY_THRESHOLD: int = 1 << 20
+    # Seconds timer_tick may spend collecting finished tasks, the rest waits for the next tick
+    COLLECTION_TIME_BUDGET: float = 0.008
+
     def __init__(self, parsed_args: _Ns, logging_level: int, /, setup_thread_pool: bool = False):
         try:
-            self.pool: LazyDynamicThreadPoolExecutor | None = None
-            self._for_loop_list: list[tuple[_ty.Callable[[_ty.Any], _ty.Any], tuple[_ty.Any]]] | None = None
-            self._running_tasks: set[str] | None = None  # Only ever accessed in main thread
-            self.max_collections_per_timer_tick: int = 5
+            self.pool: DynamicThreadPoolExecutor | None = None
+            self.process_pool: _ProcessPoolExecutor | None = None
+            self.event_loop_thread: AsyncioLoopThread | None = None  # Started by the first offload_coroutine
+            self._for_loop_list: _deque[TaskHandle] | None = None  # Finished tasks waiting to be collected, FIFO
+            self._running_tasks: set[str] | None = None  # Guarded by _task_condition
+            self._task_condition: threading.Condition = threading.Condition()  # Notified on finish and collection
+            self.max_collections_per_timer_tick: int | None = None  # Optional cap on top of the time budget
+            # Collection metrics, guarded by _task_condition as tasks can be collected on several threads
+            self._collected_count: int = 0
+            self._collection_latency_total: float = 0.0
+            self._collection_latency_max: float = 0.0
+            self._last_tick_collected: int = 0
+            self._last_tick_time: float = 0.0
             if setup_thread_pool:
-                # TODO: Migrate
-                from aplustools.io.concurrency import LazyDynamicThreadPoolExecutor, ThreadSafeList
                 # Thread pool
-                self.pool = LazyDynamicThreadPoolExecutor(0, 2, 1.0, 1)
-                self._for_loop_list = ThreadSafeList()
+                self.pool = DynamicThreadPoolExecutor(self.POOL_MIN_WORKERS, self.POOL_MAX_WORKERS,
+                                                      self.POOL_IDLE_TIMEOUT)
+                self._for_loop_list = _deque()
                 self._running_tasks = set()
+                if self.PROCESS_POOL_START_EARLY and self.PROCESS_POOL_WORKERS > 0:
+                    self._ensure_process_pool()
         except Exception as e:
             raise Exception("Exception occurred during initialization of the Main class") from e
 
@@ -261,52 +299,234 @@ class DefaultApp(MainClass):
         if not self._check_pool():
             raise RuntimeError("Pool or/and for loop list is/are not initialized")
 
-    def offload_work(self, task_name: str, task_collection_func: _a.Callable, task: _a.Callable[[], tuple[...]]) -> None:
+    def _ensure_process_pool(self) -> _ProcessPoolExecutor:
+        if self.process_pool is None:
+            self.process_pool = create_process_pool(self.PROCESS_POOL_WORKERS, self.PROCESS_POOL_PRELOAD,
+                                                    self.PROCESS_POOL_START_METHOD)
+        return self.process_pool
+
+    def offload_work(self, task_name: str, task_collection_func: _a.Callable, task: _a.Callable[[], tuple[...]],
+                     executor: _ty.Literal["thread", "process"] = "thread") -> TaskHandle:
+        """
+        Runs task on the thread pool, its result is passed to task_collection_func on the main thread by
+        timer_tick (or wait_for_manual_completion), in the order the tasks finished.
+
+        :param task_name: Unique name of the task while it runs.
+        :param task_collection_func: Gets called with the tuple returned by task unpacked.
+        :param task: The work to do.
+        :param executor: "process" runs CPU bound tasks on the process pool instead, the task then has to be
+                         picklable, e.g. a module level function or a functools.partial of one.
+        :return: Handle to wait for the task or get its result.
+        """
         self._ensure_pool()
-        if task_name in self._running_tasks:
-            raise RuntimeError(f"Cannot have two tasks with the name '{task_name}' running at the same time.")
-        self._running_tasks.add(task_name)
-        self.pool.submit(lambda:
-                             self._for_loop_list.append(
-                                 (task_name, task_collection_func, task())
-                             )
-                         )
-
-    def wait_for_completion(self, task_name: str, /, check_interval: float = 1.0) -> None:
+        if executor not in ("thread", "process"):
+            raise ValueError(f"Unknown executor '{executor}'")
+        with self._task_condition:
+            if task_name in self._running_tasks:
+                raise RuntimeError(f"Cannot have two tasks with the name '{task_name}' running at the same time.")
+            self._running_tasks.add(task_name)
+        handle: TaskHandle = TaskHandle(task_name, task_collection_func)
+        try:
+            if executor == "process":
+                future: _Future = self._ensure_process_pool().submit(run_process_task, task,
+                                                                     self.SHARED_MEMORY_THRESHOLD)
+                future.add_done_callback(lambda done: self._finish_process_task(handle, done))
+            else:
+                self.pool.submit(self._run_task, handle, task)
+        except BaseException:
+            with self._task_condition:
+                self._running_tasks.discard(task_name)
+            raise
+        return handle
+
+    def offload_coroutine(self, task_name: str, task_collection_func: _a.Callable,
+                          coro: _a.Coroutine[_ty.Any, _ty.Any, tuple[...]]) -> TaskHandle:
+        """
+        Runs a coroutine on the asyncio loop thread of the app, its result is passed to task_collection_func on
+        the main thread like the ones of offload_work. All coroutines share one thread, so thousands of I/O bound
+        tasks do not need a thread each.
+
+        :param task_name: Unique name of the task while it runs.
+        :param task_collection_func: Gets called with the tuple returned by the coroutine unpacked.
+        :param coro: The coroutine.
+        :return: Handle to wait for the task or get its result.
+        """
         self._ensure_pool()
-        while task_name in self._running_tasks:
-            time.sleep(check_interval)
+        with self._task_condition:
+            if task_name in self._running_tasks:
+                coro.close()  # Never awaited, close it so there is no warning
+                raise RuntimeError(f"Cannot have two tasks with the name '{task_name}' running at the same time.")
+            self._running_tasks.add(task_name)
+        handle: TaskHandle = TaskHandle(task_name, task_collection_func)
+        try:
+            if self.event_loop_thread is None or not self.event_loop_thread.is_running():
+                self.event_loop_thread = AsyncioLoopThread()
+            future: _Future = self.event_loop_thread.submit(coro)
+        except BaseException:
+            with self._task_condition:
+                self._running_tasks.discard(task_name)
+            raise
+        future.add_done_callback(lambda done: self._finish_future_task(handle, done))
+        return handle
+
+    def _finish_future_task(self, handle: TaskHandle, future: _Future) -> None:
+        """Called with the finished future of a coroutine, puts its result into the collection path."""
+        try:
+            result: tuple[_ty.Any, ...] = future.result()
+        except BaseException as e:  # Also the CancelledError of coroutines cancelled by close
+            handle.set_exception(e)
+        else:
+            handle.set_result(result)
+        self._task_finished(handle)
+
+    def _finish_process_task(self, handle: TaskHandle, future: _Future) -> None:
+        """Called with the finished future of a process task, puts its result into the collection path."""
+        try:
+            result: tuple[_ty.Any, ...] = resolve_shared_memory(future.result())
+        except BaseException as e:
+            handle.set_exception(e)
+        else:
+            handle.set_result(result)
+        self._task_finished(handle)
+
+    def _run_task(self, handle: TaskHandle, task: _a.Callable[[], tuple[...]]) -> None:
+        """Runs on the pool, failed tasks get collected too so they stop counting as running."""
+        try:
+            result: tuple[_ty.Any, ...] = task()
+        except BaseException as e:
+            handle.set_exception(e)
+        else:
+            handle.set_result(result)
+        self._task_finished(handle)
+
+    def _task_finished(self, handle: TaskHandle) -> None:
+        with self._task_condition:
+            self._for_loop_list.append(handle)
+            self._task_condition.notify_all()
 
-    def wait_for_manual_completion(self, task_name: str, /, check_interval: float = 1.0) -> None:
+    def _collect_task(self, handle: TaskHandle) -> None:
+        """Passes the result of a finished task to its collection function, on the main thread."""
+        latency: float | None = None if handle.finished_at is None else time.monotonic() - handle.finished_at
+        try:
+            exception: BaseException | None = handle.exception()
+            if exception is None:
+                handle.collection_func(*handle.result())
+            else:
+                message: str = (f"Task '{handle.name}' failed:\n"
+                                f"{''.join(_format_exception(type(exception), exception, exception.__traceback__))}")
+                if ActLogger.has_instance():
+                    ActLogger().error(message)
+                else:
+                    logging.error(message)
+        finally:
+            with self._task_condition:
+                if latency is not None:
+                    self._collected_count += 1
+                    self._collection_latency_total += latency
+                    if latency > self._collection_latency_max:
+                        self._collection_latency_max = latency
+                self._running_tasks.discard(handle.name)
+                self._task_condition.notify_all()
+
+    def _collect_next_task(self) -> bool:
+        try:
+            handle: TaskHandle = self._for_loop_list.popleft()
+        except IndexError:
+            return False
+        self._collect_task(handle)
+        return True
+
+    def wait_for_completion(self, task_name: str, /, check_interval: float = 1.0, timeout: float | None = None) -> bool:
+        """
+        Waits until the task has been collected, which the main thread has to do, so do not call this from it.
+
+        :param task_name: The name of the task.
+        :param check_interval: Unused, waiting is event driven. Kept for compatibility.
+        :param timeout: Maximum time to wait in seconds, None waits forever.
+        :return: If the task has been collected.
+        """
         self._ensure_pool()
-        while task_name in self._running_tasks:
-            time.sleep(check_interval)
-            if self._for_loop_list:
-                entry = self._for_loop_list.pop()
-                name, func, args = entry
-                func(*args)
-                self._running_tasks.remove(name)
+        with self._task_condition:
+            return self._task_condition.wait_for(lambda: task_name not in self._running_tasks, timeout)
+
+    def wait_for_manual_completion(self, task_name: str, /, check_interval: float = 1.0,
+                                   timeout: float | None = None) -> bool:
+        """
+        Collects finished tasks on the calling thread until the task has been collected.
+
+        :param task_name: The name of the task.
+        :param check_interval: Unused, waiting is event driven. Kept for compatibility.
+        :param timeout: Maximum time to wait in seconds, None waits forever.
+        :return: If the task has been collected.
+        """
+        self._ensure_pool()
+        deadline: float | None = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._task_condition:
+                if task_name not in self._running_tasks:
+                    return True
+                remaining: float | None = None if deadline is None else max(0.0, deadline - time.monotonic())
+                if not self._task_condition.wait_for(lambda: self._for_loop_list
+                                                     or task_name not in self._running_tasks, remaining):
+                    return False
+            while self._collect_next_task():
+                pass
+
+    def collect_tasks(self, time_budget: float | None = None) -> int:
+        """
+        Collects finished tasks until none are left or the time budget is used up. At least one task is collected
+        if any finished, so a slow collection function cannot stall the others.
+
+        :param time_budget: Seconds to spend at most, defaults to COLLECTION_TIME_BUDGET.
+        :return: How many tasks were collected.
+        """
+        if not self._check_pool():
+            return 0
+        start: float = time.monotonic()
+        deadline: float = start + (self.COLLECTION_TIME_BUDGET if time_budget is None else time_budget)
+        limit: int | None = self.max_collections_per_timer_tick
+        num_handled: int = 0
+        while (limit is None or num_handled < limit) and self._collect_next_task():
+            num_handled += 1
+            if time.monotonic() >= deadline:
+                break
+        with self._task_condition:
+            self._last_tick_collected = num_handled
+            self._last_tick_time = time.monotonic() - start
+        return num_handled
+
+    @property
+    def collection_backlog(self) -> int:
+        """How many finished tasks are waiting to be collected."""
+        return len(self._for_loop_list) if self._for_loop_list is not None else 0
+
+    def collection_stats(self) -> CollectionStats:
+        """Returns metrics about the collection of finished tasks."""
+        with self._task_condition:
+            collected: int = self._collected_count
+            return CollectionStats(self.collection_backlog,
+                                   len(self._running_tasks) if self._running_tasks is not None else 0,
+                                   collected, self._last_tick_collected, self._last_tick_time,
+                                   self._collection_latency_total / collected if collected else 0.0,
+                                   self._collection_latency_max)
 
     def timer_tick(self) -> None:
-        if self._check_pool():
-            num_handled: int = 0
-            while len(self._for_loop_list) > 0 and num_handled < self.max_collections_per_timer_tick:
-                entry = self._for_loop_list.pop()
-                name, func, args = entry
-                func(*args)
-                self._running_tasks.remove(name)
-                num_handled += 1
+        self.collect_tasks()
 
     def close(self) -> None:
         if hasattr(self, "pool") and self.pool is not None:
             self.pool.shutdown()
+        if hasattr(self, "process_pool") and self.process_pool is not None:
+            self.process_pool.shutdown(cancel_futures=True)
+        if hasattr(self, "event_loop_thread") and self.event_loop_thread is not None:
+            self.event_loop_thread.stop(timeout=5.0)
 
 class DefaultAppTUI(DefaultApp):
     def __init__(self, log_filepath: str, parsed_args: _Ns, logging_level: int, /, setup_thread_pool: bool = False) -> None:
         super().__init__(parsed_args, logging_level, setup_thread_pool=setup_thread_pool)
         try:
             # Setup ActLogger
-            self.logger: ActLogger = ActLogger(log_to_file=True, filepath=log_filepath)
+            self.logger: ActLogger = ActLogger(log_to_file=True, filepath=log_filepath, **self.LOGGER_OPTIONS)
             sys.stdout = self.logger.create_pipe_redirect(sys.stdout, level=logging.DEBUG)
             sys.stderr = self.logger.create_pipe_redirect(sys.stderr, level=logging.ERROR)
             if logging_level:
@@ -317,6 +537,8 @@ class DefaultAppTUI(DefaultApp):
                 self.logger.setLevel(mode)
             for exported_line in config.exported_logs.split("\n"):
                 self.logger.debug(exported_line)  # Flush config prints
+            if self.RELOAD_LOG_LEVELS:
+                self.logger.enable_level_reload(poll_interval=self.LOG_LEVELS_POLL_INTERVAL)
 
             self.system: BaseSystemType = get_system()
         except Exception as e:
@@ -414,7 +636,7 @@ class DefaultAppGUI(DefaultApp):
             # self.update_check_url: str = update_check_url  # TODO: Create class UpdateChecker
             # Setup IOManager
             self.io_manager: IOManager = IOManager()
-            self.io_manager.init(self.prompt_user, logs_directory, config.INDEV)
+            self.io_manager.init(self.prompt_user, logs_directory, config.INDEV, self.LOGGER_OPTIONS)
             if logging_level:
                 mode = getattr(logging, logging.getLevelName(logging_level).upper())
             else:
@@ -423,6 +645,8 @@ class DefaultAppGUI(DefaultApp):
                 self.io_manager.set_logging_level(mode)
             for exported_line in config.exported_logs.split("\n"):
                 self.io_manager.debug(exported_line)  # Flush config prints
+            if self.RELOAD_LOG_LEVELS:
+                ActLogger().enable_level_reload(poll_interval=self.LOG_LEVELS_POLL_INTERVAL)
 
             self.system: BaseSystemType = get_system()
             self.os_theme: SystemTheme = self.get_os_theme()
@@ -510,6 +734,8 @@ def start(main_class: _ty.Type[MainClass], arg_parser: _Ag | None = None, EXIT_C
                           "This error is unrecoverable.\n"
                           "Please submit the details to our GitHub issues page.")
         error_description = _format_exc()
+        if ActLogger.has_instance():  # Make sure everything up to the crash is written before we prompt
+            ActLogger().flush()
 
         if dp_app is not None:
             should_restart: bool = dp_app.crash(error_title, error_text, error_description)
@@ -525,5 +751,7 @@ def start(main_class: _ty.Type[MainClass], arg_parser: _Ag | None = None, EXIT_C
     finally:
         if dp_app is not None:
             dp_app.close()
+        if ActLogger.has_instance():
+            ActLogger().close()
         # results: str = diagnose_shutdown_blockers(return_result=True)
         EXIT_CODES.get(current_exit_code, lambda: sys.exit(current_exit_code))()
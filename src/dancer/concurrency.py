@@ -0,0 +1,428 @@
+"""Task handles and thread pools used by dancer apps"""
+from concurrent.futures import Executor as _Executor, Future as _Future, ProcessPoolExecutor as _ProcessPoolExecutor
+from multiprocessing import shared_memory as _shared_memory, resource_tracker as _resource_tracker
+from collections import deque as _deque
+import multiprocessing as _multiprocessing
+import importlib as _importlib
+import asyncio as _asyncio
+import threading
+import time
+import sys
+import os
+
+# Standard typing imports for aps
+import collections.abc as _a
+import typing as _ty
+import types as _ts
+
+__all__ = ["TaskHandle", "CollectionStats", "PoolStats", "DynamicThreadPoolExecutor", "SharedMemoryRef", "create_process_pool",
+           "run_process_task", "resolve_shared_memory", "AsyncioLoopThread"]
+
+
+class TaskHandle:
+    """
+    Handle of a task passed to DefaultApp.offload_work. The task runs on the thread pool, afterwards its result
+    gets passed to the collection function on the main thread. The handle is backed by a condition variable, so
+    waiting on it returns as soon as the task finished instead of polling.
+    """
+    def __init__(self, name: str, collection_func: _a.Callable[..., _ty.Any]) -> None:
+        """
+        Initialize the handle.
+
+        :param name: The name of the task.
+        :param collection_func: Gets called on the main thread with the result of the task unpacked.
+        """
+        self.name: str = name
+        self.collection_func: _a.Callable[..., _ty.Any] = collection_func
+        self._condition: threading.Condition = threading.Condition()
+        self._done: bool = False
+        self._result: tuple[_ty.Any, ...] | None = None
+        self._exception: BaseException | None = None
+        self._callbacks: list[_a.Callable[[TaskHandle], None]] = []
+        self.finished_at: float | None = None  # time.monotonic() of when the task finished running
+
+    def _finish(self, result: tuple[_ty.Any, ...] | None, exception: BaseException | None) -> None:
+        with self._condition:
+            self._result, self._exception = result, exception
+            self.finished_at = time.monotonic()
+            self._done = True
+            callbacks, self._callbacks = self._callbacks, []
+            self._condition.notify_all()
+        for callback in callbacks:
+            self._invoke_callback(callback)
+
+    def set_result(self, result: tuple[_ty.Any, ...]) -> None:
+        """
+        Marks the task as finished, called by the worker.
+
+        :param result: What the task returned, the arguments of the collection function.
+        """
+        self._finish(result, None)
+
+    def set_exception(self, exception: BaseException) -> None:
+        """
+        Marks the task as failed, called by the worker.
+
+        :param exception: The exception raised by the task.
+        """
+        self._finish(None, exception)
+
+    def _invoke_callback(self, callback: _a.Callable[["TaskHandle"], None]) -> None:
+        try:
+            callback(self)
+        except Exception as e:
+            print(f"Done callback of task '{self.name}' failed: {e!r}", file=sys.stderr)
+
+    def done(self) -> bool:
+        """Returns if the task has finished running, successfully or not."""
+        return self._done
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """
+        Waits until the task has finished running.
+
+        :param timeout: Maximum time to wait in seconds, None waits forever.
+        :return: If the task has finished.
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: self._done, timeout)
+
+    def result(self, timeout: float | None = None) -> tuple[_ty.Any, ...]:
+        """
+        Waits until the task has finished and returns its result.
+
+        :param timeout: Maximum time to wait in seconds, None waits forever.
+        :return: What the task returned.
+        :raises TimeoutError: If the task did not finish in time.
+        :raises BaseException: The exception raised by the task.
+        """
+        if not self.wait(timeout):
+            raise TimeoutError(f"Task '{self.name}' did not finish within {timeout} seconds")
+        if self._exception is not None:
+            raise self._exception
+        return self._result
+
+    def exception(self, timeout: float | None = None) -> BaseException | None:
+        """
+        Waits until the task has finished and returns the exception it raised.
+
+        :param timeout: Maximum time to wait in seconds, None waits forever.
+        :return: The exception or None if the task succeeded.
+        :raises TimeoutError: If the task did not finish in time.
+        """
+        if not self.wait(timeout):
+            raise TimeoutError(f"Task '{self.name}' did not finish within {timeout} seconds")
+        return self._exception
+
+    def add_done_callback(self, callback: _a.Callable[["TaskHandle"], None]) -> None:
+        """
+        Adds a callable that gets invoked with this handle once the task has finished. It runs on the worker
+        thread, or right away if the task has already finished.
+
+        :param callback: The callable.
+        """
+        with self._condition:
+            if not self._done:
+                self._callbacks.append(callback)
+                return
+        self._invoke_callback(callback)
+
+    def __repr__(self) -> str:
+        state: str = "pending" if not self._done else ("failed" if self._exception is not None else "finished")
+        return f"<TaskHandle '{self.name}' {state}>"
+
+
+class CollectionStats(_ty.NamedTuple):
+    """Snapshot of how fast a DefaultApp collects the results of finished tasks."""
+    backlog: int  # Finished tasks waiting to be collected
+    running: int  # Tasks that have not been collected yet, including the backlog
+    collected: int
+    last_tick_collected: int
+    last_tick_time: float  # Seconds the last collection took
+    average_latency: float  # Seconds between a task finishing and being collected on average
+    max_latency: float
+
+
+class PoolStats(_ty.NamedTuple):
+    """Snapshot of the state of a DynamicThreadPoolExecutor."""
+    workers: int
+    idle: int
+    queued: int
+    running: int
+    completed: int
+    average_wait: float  # Seconds a task waited in the queue on average
+
+
+class _WorkItem:
+    __slots__ = ("future", "fn", "args", "kwargs", "enqueued")
+
+    def __init__(self, future: _Future, fn: _a.Callable[..., _ty.Any], args: tuple[_ty.Any, ...],
+                 kwargs: dict[str, _ty.Any]) -> None:
+        self.future: _Future = future
+        self.fn: _a.Callable[..., _ty.Any] = fn
+        self.args: tuple[_ty.Any, ...] = args
+        self.kwargs: dict[str, _ty.Any] = kwargs
+        self.enqueued: float = time.monotonic()
+
+
+class DynamicThreadPoolExecutor(_Executor):
+    """
+    Thread pool that scales between min_workers and max_workers. A new worker is started when more tasks are
+    queued than workers are idle, workers above min_workers retire after being idle for idle_timeout seconds.
+    stats() returns the number of queued, running and completed tasks and the average time tasks waited.
+    """
+    def __init__(self, min_workers: int = 0, max_workers: int = 4, idle_timeout: float = 1.0,
+                 thread_name_prefix: str = "DancerPool") -> None:
+        """
+        Initialize the pool, min_workers workers get started right away.
+
+        :param min_workers: Number of workers that are kept even while idle.
+        :param max_workers: Maximum number of workers.
+        :param idle_timeout: Seconds after which an idle worker above min_workers retires.
+        :param thread_name_prefix: Prefix of the worker thread names.
+        """
+        if max_workers <= 0 or min_workers < 0 or min_workers > max_workers:
+            raise ValueError("The workers have to satisfy 0 <= min_workers <= max_workers and max_workers > 0")
+        self.min_workers: int = min_workers
+        self.max_workers: int = max_workers
+        self.idle_timeout: float = idle_timeout
+        self.thread_name_prefix: str = thread_name_prefix
+        self._queue: _deque[_WorkItem] = _deque()
+        self._condition: threading.Condition = threading.Condition()
+        self._workers: set[threading.Thread] = set()
+        self._idle: int = 0
+        self._running: int = 0
+        self._completed: int = 0
+        self._total_wait: float = 0.0
+        self._started: int = 0  # Tasks taken from the queue, for the average wait
+        self._shutdown: bool = False
+        self._thread_counter: int = 0
+        with self._condition:
+            for _ in range(min_workers):
+                self._start_worker()
+
+    def _start_worker(self) -> None:
+        """Starts a worker, the condition has to be held."""
+        self._thread_counter += 1
+        worker: threading.Thread = threading.Thread(target=self._work, name=f"{self.thread_name_prefix}-"
+                                                                             f"{self._thread_counter}",
+                                                    daemon=True)
+        self._workers.add(worker)
+        worker.start()
+
+    def submit(self, fn: _a.Callable[..., _ty.Any], /, *args: _ty.Any, **kwargs: _ty.Any) -> _Future:
+        """
+        Schedules fn(*args, **kwargs) to run on the pool.
+
+        :param fn: The callable.
+        :return: Future of the return value of fn.
+        """
+        future: _Future = _Future()
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError("Cannot submit tasks after the pool has been shut down")
+            self._queue.append(_WorkItem(future, fn, args, kwargs))
+            if len(self._queue) > self._idle and len(self._workers) < self.max_workers:
+                self._start_worker()
+            else:
+                self._condition.notify()
+        return future
+
+    def _work(self) -> None:
+        current: threading.Thread = threading.current_thread()
+        while True:
+            with self._condition:
+                deadline: float = time.monotonic() + self.idle_timeout
+                while not self._queue:
+                    remaining: float = deadline - time.monotonic()
+                    if self._shutdown or (remaining <= 0 and len(self._workers) > self.min_workers):
+                        self._workers.discard(current)
+                        return
+                    self._idle += 1
+                    self._condition.wait(remaining if remaining > 0 else self.idle_timeout)
+                    self._idle -= 1
+                item: _WorkItem = self._queue.popleft()
+                self._running += 1
+                self._started += 1
+                self._total_wait += time.monotonic() - item.enqueued
+            try:
+                if item.future.set_running_or_notify_cancel():
+                    try:
+                        result: _ty.Any = item.fn(*item.args, **item.kwargs)
+                    except BaseException as e:
+                        item.future.set_exception(e)
+                    else:
+                        item.future.set_result(result)
+            finally:
+                del item
+                with self._condition:
+                    self._running -= 1
+                    self._completed += 1
+
+    def stats(self) -> PoolStats:
+        """Returns the current state of the pool."""
+        with self._condition:
+            return PoolStats(len(self._workers), self._idle, len(self._queue), self._running, self._completed,
+                             self._total_wait / self._started if self._started else 0.0)
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        """
+        Stops the pool, queued tasks still get run unless cancel_futures is set.
+
+        :param wait: If the call waits for the workers to finish.
+        :param cancel_futures: If queued tasks get cancelled.
+        """
+        with self._condition:
+            self._shutdown = True
+            if cancel_futures:
+                while self._queue:
+                    self._queue.popleft().future.cancel()
+            workers: list[threading.Thread] = list(self._workers)
+            self._condition.notify_all()
+        if wait:
+            current: threading.Thread = threading.current_thread()
+            for worker in workers:
+                if worker is not current:
+                    worker.join()
+
+
+class SharedMemoryRef(_ty.NamedTuple):
+    """A bytes-like result of a process task that was put into a shared memory block instead of being pickled."""
+    name: str
+    size: int
+    kind: _ty.Literal["bytes", "bytearray"]
+
+
+def _preload_modules(modules: tuple[str, ...]) -> None:
+    """Initializer of the process pool workers, imports the modules tasks need so the first task is not slowed."""
+    for module in modules:
+        _importlib.import_module(module)
+
+
+def _warm_up(delay: float) -> int:
+    time.sleep(delay)  # Keeps this worker busy, so the next warm up call starts another one
+    return os.getpid()
+
+
+def create_process_pool(max_workers: int, preload: _a.Iterable[str] = (),
+                        start_method: str | None = "spawn") -> _ProcessPoolExecutor:
+    """
+    Creates a process pool and starts all of its workers, which import the preload modules first.
+
+    :param max_workers: Number of worker processes.
+    :param preload: Names of modules that get imported by every worker when it starts.
+    :param start_method: The multiprocessing start method, spawn avoids forking a process that runs threads.
+    :return: The process pool.
+    """
+    pool: _ProcessPoolExecutor = _ProcessPoolExecutor(max_workers, _multiprocessing.get_context(start_method),
+                                                      initializer=_preload_modules, initargs=(tuple(preload),))
+    for _ in range(max_workers):  # Workers are started on demand, these calls make the pool start all of them
+        pool.submit(_warm_up, 0.05)
+    return pool
+
+
+def _to_shared_memory(data: bytes | bytearray | memoryview) -> SharedMemoryRef:
+    view: memoryview = memoryview(data).cast("B")
+    shm: _shared_memory.SharedMemory = _shared_memory.SharedMemory(create=True, size=max(1, view.nbytes))
+    try:
+        shm.buf[:view.nbytes] = view
+    finally:
+        shm.close()
+    if sys.version_info < (3, 13):  # The parent process unlinks the block, so this one must not track it
+        _resource_tracker.unregister(shm._name, "shared_memory")  # type: ignore[attr-defined]
+    return SharedMemoryRef(shm.name, view.nbytes, "bytearray" if isinstance(data, bytearray) else "bytes")
+
+
+def run_process_task(task: _a.Callable[[], tuple[_ty.Any, ...]], shared_memory_threshold: int) -> tuple[_ty.Any, ...]:
+    """
+    Runs a task in a process pool worker. Bytes-like items of the returned tuple of at least
+    shared_memory_threshold bytes are put into shared memory, see resolve_shared_memory.
+
+    :param task: The task, it has to be picklable, e.g. a module level function or a functools.partial of one.
+    :param shared_memory_threshold: Minimum size in bytes of items that go through shared memory, 0 disables it.
+    :return: The result of the task.
+    """
+    result: tuple[_ty.Any, ...] = task()
+    if shared_memory_threshold <= 0 or os.name == "nt":  # On windows the block is gone once this process closes it
+        return result
+    return tuple(_to_shared_memory(item) if isinstance(item, (bytes, bytearray, memoryview))
+                 and memoryview(item).nbytes >= shared_memory_threshold else item for item in result)
+
+
+def resolve_shared_memory(result: tuple[_ty.Any, ...]) -> tuple[_ty.Any, ...]:
+    """
+    Replaces the SharedMemoryRef items of a process task result with their data and frees the blocks.
+
+    :param result: The result returned by run_process_task.
+    :return: The result with the data.
+    """
+    resolved: list[_ty.Any] = []
+    for item in result:
+        if isinstance(item, SharedMemoryRef):
+            shm: _shared_memory.SharedMemory = _shared_memory.SharedMemory(name=item.name)
+            try:
+                data: bytes | bytearray = (bytearray if item.kind == "bytearray" else bytes)(shm.buf[:item.size])
+            finally:
+                shm.close()
+                shm.unlink()
+            item = data
+        resolved.append(item)
+    return tuple(resolved)
+
+
+class AsyncioLoopThread:
+    """
+    Runs an asyncio event loop on a dedicated daemon thread, so coroutines can be used next to a blocking UI or
+    server loop. Any thread can submit coroutines, all of them share the one loop thread.
+    """
+    def __init__(self, name: str = "DancerAsyncio") -> None:
+        """
+        Start the loop thread.
+
+        :param name: Name of the thread.
+        """
+        self.loop: _asyncio.AbstractEventLoop = _asyncio.new_event_loop()
+        started: threading.Event = threading.Event()
+        self._thread: threading.Thread = threading.Thread(target=self._run, args=(started,), name=name, daemon=True)
+        self._thread.start()
+        started.wait()
+
+    def _run(self, started: threading.Event) -> None:
+        _asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(started.set)
+        try:
+            self.loop.run_forever()
+        finally:
+            try:
+                pending: set[_asyncio.Task] = _asyncio.all_tasks(self.loop)
+                for task in pending:
+                    task.cancel()
+                if pending:
+                    self.loop.run_until_complete(_asyncio.gather(*pending, return_exceptions=True))
+                self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+            finally:
+                self.loop.close()
+
+    def is_running(self) -> bool:
+        """Returns if the loop thread is still running."""
+        return self._thread.is_alive()
+
+    def submit(self, coro: _a.Coroutine[_ty.Any, _ty.Any, _ty.Any]) -> _Future:
+        """
+        Schedules a coroutine on the loop.
+
+        :param coro: The coroutine.
+        :return: A concurrent.futures.Future of its result.
+        """
+        return _asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def stop(self, timeout: float | None = None) -> None:
+        """
+        Stops the loop, coroutines that are still running get cancelled.
+
+        :param timeout: Maximum time to wait for the loop thread in seconds, None waits forever.
+        """
+        if self._thread.is_alive():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            if threading.current_thread() is not self._thread:
+                self._thread.join(timeout)
@@ -3,13 +3,31 @@ from pathlib import Path as PLPath
 from logging import ERROR, WARNING, INFO, DEBUG
 import logging as _logging
 import threading
-from queue import Queue
+from queue import Queue, SimpleQueue, Empty
+from collections import deque as _deque
+from datetime import datetime as _datetime
+import bisect as _bisect
+import struct as _struct
+import json as _json
+import mmap as _mmap
+import shutil as _shutil
+from multiprocessing.connection import Listener as _Listener, Client as _Client, Connection as _Connection
+from multiprocessing import util as _mp_util
+from concurrent.futures import Future as _Future
+import multiprocessing as _multiprocessing
+import random as _random
+import gzip as _gzip
+import hashlib as _hashlib
+import functools as _functools
+import signal as _signal
 from enum import Enum as _Enum
 import sys as _sys
 import sys
 import logging
 import abc as _abc
 import re
+import atexit
+import time
 import io
 import os
 
@@ -18,65 +36,1433 @@ import collections.abc as _a
 import typing as _ty
 import types as _ts
 
+from . import config
+
 
 # Copyright adalfarus
 class SingletonMeta(type):
     """
     Metaclass to make UnifiedRequestHandlerAdvanced a Singleton.
+    The instance is created under a lock, once it exists it is returned without locking. After a fork the
+    child starts without instances, the old ones get their _after_fork_in_child method called if they have one.
     """
     _instances: dict[_ty.Type[_ty.Any], _ty.Any] = {}
+    _lock: threading.RLock = threading.RLock()  # Reentrant, as creating one singleton may create another
 
     def __call__(cls, *args, **kwargs):
-        if cls not in cls._instances:
-            instance = super().__call__(*args, **kwargs)
-            cls._instances[cls] = instance
-        return cls._instances[cls]
+        instance = SingletonMeta._instances.get(cls)  # Fast path, a single dict lookup
+        if instance is not None:
+            return instance
+        with SingletonMeta._lock:
+            instance = SingletonMeta._instances.get(cls)
+            if instance is None:
+                instance = super().__call__(*args, **kwargs)
+                SingletonMeta._instances[cls] = instance
+        return instance
+
+    @staticmethod
+    def _after_fork_in_child() -> None:
+        SingletonMeta._lock = threading.RLock()  # Could have been held by another thread of the parent
+        instances: dict[_ty.Type[_ty.Any], _ty.Any] = SingletonMeta._instances
+        SingletonMeta._instances = {}
+        for instance in instances.values():
+            hook: _ty.Callable[[], None] | None = getattr(instance, "_after_fork_in_child", None)
+            if hook is None:
+                continue
+            try:
+                hook()
+            except Exception as e:
+                print(f"Resetting {type(instance).__name__} after fork failed: {e}", file=_sys.__stderr__)
+
+    def has_instance(cls) -> bool:
+        """
+        Returns if the singleton instance of this class has already been created.
+        :return: bool
+        """
+        return cls in SingletonMeta._instances
+
+if hasattr(os, "register_at_fork"):  # Not available on windows, which has no fork
+    os.register_at_fork(after_in_child=SingletonMeta._after_fork_in_child)
 
 # Copyright adalfarus
 # Helper class to redirect streams to the logger
+class _LineBuffer:
+    """The partial line of one thread that wrote to a _StreamToLogger."""
+    __slots__ = ("parts", "length", "thread")
+
+    def __init__(self, thread: threading.Thread) -> None:
+        self.parts: list[str] = []  # Pieces of the current partial line
+        self.length: int = 0
+        self.thread: threading.Thread = thread  # The owner, buffers of finished threads get pruned
+
 class _StreamToLogger(io.IOBase):
     """
     File-like object that redirects writes to a logger instance.
+    Every thread assembles its lines in its own buffer, so output of threads printing at the same time does
+    not get mixed within a line and no lock is needed, only complete lines are passed to the logger.
     """
+    MAX_IDLE_BUFFERS: int = 64  # Buffers of finished threads get cleaned up once there are more
 
-    def __init__(self, logger, log_level, original_stream: _ty.IO):
+    def __init__(self, logger, log_level, original_stream: _ty.IO, max_line_length: int = 65536):
         """
         Initialize the stream redirection.
 
         :param logger: Logger instance where messages will be redirected.
         :param log_level: Logging level for the redirected messages.
+        :param original_stream: The stream that gets replaced, returned by restore().
+        :param max_line_length: Maximum length of a partial line, longer output without a newline
+                                gets logged in chunks of this size.
         """
         self.logger = logger
         self.log_level = log_level
         self.original_stream = original_stream
-        self.linebuf = ""
+        self.max_line_length: int = max_line_length
+        # The buffer of a thread lives in a threading.local and not under its ident, as idents of finished threads
+        # get reused and a new thread would continue their partial line. _buffers keeps them for flush_all.
+        self._local: threading.local = threading.local()
+        self._buffers: dict[int, _LineBuffer] = {}  # id(buffer) -> buffer
+
+    def _get_buffer(self) -> _LineBuffer:
+        buffer: _LineBuffer | None = getattr(self._local, "buffer", None)
+        if buffer is None:
+            if len(self._buffers) >= self.MAX_IDLE_BUFFERS:
+                self._prune_buffers()
+            buffer = self._local.buffer = _LineBuffer(threading.current_thread())
+            self._buffers[id(buffer)] = buffer
+        return buffer
+
+    def _prune_buffers(self) -> None:
+        """Logs the partial lines of threads that have finished and removes their buffers."""
+        for key, buffer in list(self._buffers.items()):
+            if not buffer.thread.is_alive():
+                if self._buffers.pop(key, None) is not None:
+                    self._flush_buffer(buffer)
+
+    def _reset_buffers(self) -> None:
+        """Drops all partial lines without logging them, used in the child after a fork."""
+        self._local = threading.local()
+        self._buffers = {}
+
+    @property
+    def linebuf(self) -> str:
+        """The partial line of the current thread that has not been terminated by a newline yet."""
+        buffer: _LineBuffer | None = getattr(self._local, "buffer", None)
+        return "".join(buffer.parts) if buffer is not None else ""
 
     def write(self, buf):
         """
         Write method for the file-like object.
 
         :param buf: String to write.
-        """
-        self.linebuf += buf
-        while "\n" in self.linebuf:
-            line, self.linebuf = self.linebuf.split("\n", 1)
-            if line:
-                self.logger.log(self.log_level, line)
-            else:
-                # Handle empty lines (e.g., when there are multiple newlines)
-                self.logger.log(self.log_level, "")
+        :return: The number of characters written.
+        """
+        if not buf:
+            return 0
+        buffer: _LineBuffer = self._get_buffer()
+        if "\n" not in buf:
+            buffer.parts.append(buf)
+            buffer.length += len(buf)
+            if buffer.length >= self.max_line_length:
+                self._emit_oversized(buffer)
+            return len(buf)
+
+        lines: list[str] = buf.split("\n")
+        if buffer.parts:
+            buffer.parts.append(lines[0])
+            lines[0] = "".join(buffer.parts)
+        rest: str = lines.pop()
+        buffer.parts = [rest] if rest else []
+        buffer.length = len(rest)
+
+        if self.logger.isEnabledFor(self.log_level):
+            log = self.logger.log
+            level = self.log_level
+            for line in lines:  # Empty lines (e.g. when there are multiple newlines) get logged too
+                if len(line) > self.max_line_length:
+                    for i in range(0, len(line), self.max_line_length):
+                        log(level, line[i:i + self.max_line_length])
+                else:
+                    log(level, line)
+        if buffer.length >= self.max_line_length:
+            self._emit_oversized(buffer)
+        return len(buf)
+
+    def writelines(self, lines: _ty.Iterable[str]) -> None:
+        """
+        Writes all strings in lines, like file.writelines no newlines get added.
+
+        :param lines: The strings to write.
+        """
+        self.write("".join(lines))
+
+    def _emit_oversized(self, buffer: _LineBuffer) -> None:
+        """Logs full chunks of an oversized partial line and keeps the remainder."""
+        partial: str = "".join(buffer.parts)
+        cut: int = len(partial) - len(partial) % self.max_line_length
+        if self.logger.isEnabledFor(self.log_level):
+            for i in range(0, cut, self.max_line_length):
+                self.logger.log(self.log_level, partial[i:i + self.max_line_length])
+        rest: str = partial[cut:]
+        buffer.parts = [rest] if rest else []
+        buffer.length = len(rest)
+
+    def _flush_buffer(self, buffer: _LineBuffer) -> None:
+        if buffer.parts:
+            partial: str = "".join(buffer.parts)
+            buffer.parts = []
+            buffer.length = 0
+            self.logger.log(self.log_level, partial.rstrip())
 
     def flush(self):
         """
-        Flush method for file-like object.
+        Flush method for file-like object, logs the partial line of the current thread.
         """
-        if self.linebuf:
-            self.logger.log(self.log_level, self.linebuf.rstrip())
-            self.linebuf = ""
+        buffer: _LineBuffer | None = getattr(self._local, "buffer", None)
+        if buffer is not None:
+            self._flush_buffer(buffer)
+
+    def flush_all(self) -> None:
+        """Logs the partial lines of all threads, running threads keep their buffer."""
+        for key, buffer in list(self._buffers.items()):
+            if not buffer.thread.is_alive():
+                self._buffers.pop(key, None)
+            self._flush_buffer(buffer)
 
     def restore(self) -> io.IOBase:
+        self.flush_all()
         return self.original_stream
 
+# Copyright adalfarus
+class ActFormatter(_logging.Formatter):
+    """
+    Formatter producing the ActLogger format '[%Y-%m-%d %H:%M:%S.mmm] [LEVEL] message'. Instead of calling
+    time.strftime for every record, the date prefix is cached per second and only the milliseconds get
+    appended, the level tags are precomputed as well.
+    """
+    def __init__(self) -> None:
+        super().__init__('[%(asctime)s.%(msecs)03d] [%(levelname)s] %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+        self._date_cache: tuple[int, str, str] = (-1, "", "")  # second, asctime, prefix; swapped atomically
+        self._level_tags: dict[str, str] = {name: f"] [{name}] " for name in
+                                            ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")}
+
+    def format(self, record: _logging.LogRecord) -> str:
+        second: int = int(record.created)
+        cached_second, asctime, prefix = self._date_cache
+        if second != cached_second:
+            asctime = time.strftime(self.datefmt, self.converter(second))
+            prefix = f"[{asctime}."
+            self._date_cache = (second, asctime, prefix)
+        record.asctime = asctime
+        record.message = record.getMessage()
+        level_tag: str | None = self._level_tags.get(record.levelname)
+        if level_tag is None:
+            level_tag = self._level_tags[record.levelname] = f"] [{record.levelname}] "
+        s: str = f"{prefix}{int(record.msecs):03d}{level_tag}{record.message}"
+
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            if s[-1:] != "\n":
+                s = s + "\n"
+            s = s + record.exc_text
+        if record.stack_info:
+            if s[-1:] != "\n":
+                s = s + "\n"
+            s = s + self.formatStack(record.stack_info)
+        return s
+
+# Helpers for the asynchronous mode of the ActLogger
+def _write_batch(handler: _logging.Handler, records: list[_logging.LogRecord]) -> None:
+    """
+    Writes a batch of records to a handler, only flushing stream handlers once per batch.
+
+    :param handler: The handler to write to.
+    :param records: The records to pass to the handler, in order.
+    """
+    emit_batch = getattr(handler, "emit_batch", None)
+    if emit_batch is None and not (isinstance(handler, _logging.StreamHandler)
+                                   and getattr(handler, "stream", None) is not None):
+        for record in records:
+            handler.handle(record)
+        return
+    accepted: list[_logging.LogRecord] = [record for record in records
+                                          if record.levelno >= handler.level and handler.filter(record)]
+    if not accepted:
+        return
+    if emit_batch is not None:
+        emit_batch(accepted)
+        return
+    parts: list[str] = []
+    for record in accepted:
+        try:
+            parts.append(handler.format(record) + handler.terminator)
+        except Exception:
+            handler.handleError(record)
+    handler.acquire()
+    try:
+        handler.stream.write("".join(parts))
+        handler.flush()
+    except Exception:
+        handler.handleError(accepted[-1])
+    finally:
+        handler.release()
+
+class _AsyncLogDispatcher:
+    """
+    Owns the background writer thread of an asynchronous ActLogger. Records get put into a queue by the
+    _QueueHandler and the writer thread formats and writes them to the wrapped handlers in batches.
+    """
+    _STOP: object = object()
+
+    def __init__(self, handlers: list[_logging.Handler], batch_size: int = 1024) -> None:
+        """
+        Initialize the dispatcher and start its writer thread.
+
+        :param handlers: The handlers that records get written to.
+        :param batch_size: The maximum amount of records that get written at once.
+        """
+        self.handlers: list[_logging.Handler] = handlers
+        self.batch_size: int = batch_size
+        self._queue: SimpleQueue = SimpleQueue()
+        self._closed: bool = False
+        self._thread: threading.Thread = threading.Thread(target=self._run, name="ActLoggerWriter", daemon=True)
+        self._thread.start()
+
+    def enqueue(self, record: _logging.LogRecord) -> None:
+        """
+        Puts a record into the queue, once the dispatcher is closed records get written synchronously.
+
+        :param record: The record to write.
+        """
+        if self._closed:
+            self._write([record])
+            return
+        self._queue.put(record)
+
+    def _write(self, records: list[_logging.LogRecord]) -> None:
+        for handler in self.handlers:
+            _write_batch(handler, records)
+
+    def _run(self) -> None:
+        while True:
+            batch: list[_ty.Any] = [self._queue.get()]
+            try:
+                while len(batch) < self.batch_size:
+                    batch.append(self._queue.get_nowait())
+            except Empty:
+                pass
+            records: list[_logging.LogRecord] = []
+            for item in batch:
+                if isinstance(item, _logging.LogRecord):
+                    records.append(item)
+                    continue
+                if records:  # Everything before a marker has to be written before it is handled
+                    self._write(records)
+                    records = []
+                if item is self._STOP:
+                    return
+                item.set()  # Flush marker
+            if records:
+                self._write(records)
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """
+        Blocks until every record that was queued before this call has been written.
+
+        :param timeout: Maximum time to wait in seconds, None waits forever.
+        :return: True if everything was written in time, False otherwise.
+        """
+        if self._closed or not self._thread.is_alive():
+            return True
+        marker = threading.Event()
+        self._queue.put(marker)
+        return marker.wait(timeout)
+
+    def close(self) -> None:
+        """
+        Writes all remaining records and stops the writer thread. Records logged afterwards get
+        written synchronously.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join()
+        leftovers: list[_logging.LogRecord] = []
+        try:
+            while True:
+                item = self._queue.get_nowait()
+                if isinstance(item, _logging.LogRecord):
+                    leftovers.append(item)
+                elif item is not self._STOP:
+                    item.set()
+        except Empty:
+            pass
+        if leftovers:
+            self._write(leftovers)
+
+class _QueueHandler(_logging.Handler):
+    """
+    Handler that only hands records over to an _AsyncLogDispatcher, the formatting and writing
+    happens on the dispatchers writer thread.
+    """
+    _exception_formatter: _logging.Formatter = _logging.Formatter()
+
+    def __init__(self, dispatcher: _AsyncLogDispatcher) -> None:
+        super().__init__()
+        self.dispatcher: _AsyncLogDispatcher = dispatcher
+
+    def prepare(self, record: _logging.LogRecord) -> _logging.LogRecord:
+        """
+        Merges the message and exception into the record on the calling thread, so objects passed as args that
+        change afterwards do not change what gets logged. Only timestamps and I/O are left to the writer thread.
+        """
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self._exception_formatter.formatException(record.exc_info)
+        record.exc_info = None  # exc_text has it, and the traceback would keep its frames alive
+        return record
+
+    def handle(self, record: _logging.LogRecord) -> bool:
+        # We skip the handler lock, the queue is already thread-safe
+        rv = self.filter(record)
+        if rv:
+            self.dispatcher.enqueue(self.prepare(record))
+        return rv
+
+    def emit(self, record: _logging.LogRecord) -> None:
+        self.dispatcher.enqueue(self.prepare(record))
+
+    def flush(self) -> None:
+        self.dispatcher.flush()
+
+# Structured log formats
+_BINARY_LOG_MAGIC: bytes = b"DLOG\x01\n"
+_BINARY_RECORD_SYNC: bytes = b"\xd1\x0b"
+_BINARY_RECORD_HEADER: _struct.Struct = _struct.Struct("<2sIdBI")  # sync, message length, created, levelno, pid
+
+def _record_message(formatter: _logging.Formatter, record: _logging.LogRecord) -> str:
+    """Returns the message of a record including a formatted exception and stack info."""
+    message: str = record.getMessage()
+    if record.exc_info and not record.exc_text:
+        record.exc_text = formatter.formatException(record.exc_info)
+    if record.exc_text:
+        message = f"{message}\n{record.exc_text}"
+    if record.stack_info:
+        message = f"{message}\n{formatter.formatStack(record.stack_info)}"
+    return message
+
+class _JSONLinesFormatter(_logging.Formatter):
+    """
+    Formats records as one JSON object per line. The timestamp and level always come first,
+    so the StructuredLogReader can read them without parsing the whole line.
+    """
+    def format(self, record: _logging.LogRecord) -> str:
+        return _json.dumps({"t": record.created, "lvl": record.levelno, "level": record.levelname,
+                            "name": record.name, "pid": record.process, "thread": record.threadName,
+                            "msg": _record_message(self, record)}, separators=(",", ":"), ensure_ascii=False)
+
+class _BinaryLogFormatter(_logging.Formatter):
+    """
+    Formats records as length-prefixed binary records (see _BINARY_RECORD_HEADER) followed by the utf-8
+    encoded message. Every record starts with a sync marker, so a reader can resynchronize at any offset.
+    """
+    def format(self, record: _logging.LogRecord) -> bytes:  # type: ignore[override]
+        message: bytes = _record_message(self, record).encode("utf-8", "replace")
+        return _BINARY_RECORD_HEADER.pack(_BINARY_RECORD_SYNC, len(message), record.created,
+                                          min(max(record.levelno, 0), 255), record.process or 0) + message
+
+class StructuredLogEntry(_ty.NamedTuple):
+    """A single record read from a structured log file."""
+    timestamp: float
+    levelno: int
+    message: str
+    pid: int
+    offset: int
+
+    @property
+    def levelname(self) -> str:
+        return _logging.getLevelName(self.levelno)
+
+    @property
+    def datetime(self) -> _datetime:
+        return _datetime.fromtimestamp(self.timestamp)
+
+# Copyright adalfarus
+class StructuredLogReader:
+    """
+    Reads JSON Lines or binary log files written by the ActLogger (log_format="jsonl"/"binary").
+
+    The file is memory-mapped and a sparse index with the first timestamp of every block of block_size
+    bytes is built by sampling the file, so it never has to be read as a whole. Time ranges are found
+    through a binary search over that index and the levels found in a block are remembered once it has
+    been scanned, so later queries can skip blocks without matching records.
+    """
+    def __init__(self, filepath: str | PLPath, block_size: int = 1 << 20) -> None:
+        """
+        Open a structured log file.
+
+        :param filepath: Path of the log file.
+        :param block_size: Size of an index block in bytes.
+        """
+        self.filepath: str = str(filepath)
+        self.block_size: int = block_size
+        self._file = open(self.filepath, "rb")
+        self._size: int = os.fstat(self._file.fileno()).st_size
+        self._mmap: _mmap.mmap | bytes = b""
+        if self._size > 0:
+            self._mmap = _mmap.mmap(self._file.fileno(), 0, access=_mmap.ACCESS_READ)
+        self.binary: bool = self._mmap[:len(_BINARY_LOG_MAGIC)] == _BINARY_LOG_MAGIC
+        self._data_start: int = len(_BINARY_LOG_MAGIC) if self.binary else 0
+        if self._size > 0 and not self.binary and self._mmap[:1] != b"{":
+            self.close()
+            raise ValueError(f"'{self.filepath}' is not a structured log file")
+        self._block_offsets: list[int] | None = None
+        self._block_times: list[float] = []
+        self._block_masks: dict[int, int] = {}  # Block number -> bitmask of levelno // 10
+
+    def close(self) -> None:
+        if isinstance(self._mmap, _mmap.mmap):
+            self._mmap.close()
+        self._file.close()
+
+    def __enter__(self) -> "StructuredLogReader":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    @staticmethod
+    def _level_bit(levelno: int) -> int:
+        return 1 << min(levelno // 10, 31)
+
+    def _head_at(self, offset: int) -> tuple[float, int, int]:
+        """Returns the timestamp, level and end offset of the record at offset without decoding the message."""
+        m = self._mmap
+        if self.binary:
+            _, length, created, levelno, _ = _BINARY_RECORD_HEADER.unpack_from(m, offset)
+            return created, levelno, offset + _BINARY_RECORD_HEADER.size + length
+        end: int = m.find(b"\n", offset)
+        if end == -1:
+            end = self._size
+        comma: int = m.find(b",", offset, end)
+        level_end: int = m.find(b",", comma + 1, end)
+        if m[offset:offset + 5] == b'{"t":' and m[comma:comma + 7] == b',"lvl":':
+            return float(m[offset + 5:comma]), int(m[comma + 7:level_end]), end + 1
+        data: dict[str, _ty.Any] = _json.loads(m[offset:end])
+        return float(data["t"]), int(data["lvl"]), end + 1
+
+    def _entry_at(self, offset: int) -> StructuredLogEntry:
+        m = self._mmap
+        if self.binary:
+            _, length, created, levelno, pid = _BINARY_RECORD_HEADER.unpack_from(m, offset)
+            start: int = offset + _BINARY_RECORD_HEADER.size
+            return StructuredLogEntry(created, levelno, m[start:start + length].decode("utf-8", "replace"),
+                                      pid, offset)
+        end: int = m.find(b"\n", offset)
+        data: dict[str, _ty.Any] = _json.loads(m[offset:end if end != -1 else self._size])
+        return StructuredLogEntry(float(data["t"]), int(data["lvl"]), data.get("msg", ""), data.get("pid", 0), offset)
+
+    def _is_valid_binary_record(self, offset: int) -> bool:
+        if offset + _BINARY_RECORD_HEADER.size > self._size:
+            return False
+        sync, length, *_ = _BINARY_RECORD_HEADER.unpack_from(self._mmap, offset)
+        end: int = offset + _BINARY_RECORD_HEADER.size + length
+        return sync == _BINARY_RECORD_SYNC and (end == self._size or self._mmap[end:end + 2] == _BINARY_RECORD_SYNC)
+
+    def _sync(self, offset: int) -> int:
+        """Returns the offset of the first record that starts at or after offset."""
+        if offset <= self._data_start:
+            return self._data_start
+        if self.binary:
+            while True:
+                offset = self._mmap.find(_BINARY_RECORD_SYNC, offset)
+                if offset == -1:
+                    return self._size
+                if self._is_valid_binary_record(offset):
+                    return offset
+                offset += 1
+        if self._mmap[offset - 1:offset] == b"\n":
+            return offset
+        newline: int = self._mmap.find(b"\n", offset)
+        return self._size if newline == -1 else newline + 1
+
+    def build_index(self) -> None:
+        """Builds the sparse block index by sampling the first record of every block."""
+        offsets: list[int] = []
+        times: list[float] = []
+        for block_start in range(self._data_start, self._size, self.block_size):
+            offset: int = self._sync(block_start)
+            if offset >= self._size or (offsets and offset == offsets[-1]):
+                continue
+            offsets.append(offset)
+            times.append(self._head_at(offset)[0])
+        self._block_offsets, self._block_times = offsets, times
+        self._block_masks.clear()
+
+    @staticmethod
+    def _to_timestamp(value: float | _datetime | None, default: float) -> float:
+        if value is None:
+            return default
+        if isinstance(value, _datetime):
+            return value.timestamp()
+        return float(value)
+
+    def query(self, start: float | _datetime | None = None, end: float | _datetime | None = None,
+              levels: _ty.Iterable[int] | None = None,
+              min_level: int = _logging.NOTSET) -> _ty.Iterator[StructuredLogEntry]:
+        """
+        Yields all records between start and end (inclusive) matching the level filters, in file order.
+
+        :param start: Earliest timestamp or datetime, None for no limit.
+        :param end: Latest timestamp or datetime, None for no limit.
+        :param levels: Exact levels to return, e.g. (logging.ERROR,), None for all levels.
+        :param min_level: Only return records at or above this level.
+        :return: An iterator of StructuredLogEntry.
+        """
+        if self._block_offsets is None:
+            self.build_index()
+        offsets: list[int] = self._block_offsets  # type: ignore
+        start_ts: float = self._to_timestamp(start, float("-inf"))
+        end_ts: float = self._to_timestamp(end, float("inf"))
+        level_set: frozenset[int] | None = frozenset(levels) if levels is not None else None
+        wanted_mask: int = ~((1 << (min_level // 10)) - 1) if min_level > 0 else ~0
+        if level_set is not None:
+            wanted_mask &= sum({self._level_bit(level) for level in level_set})
+
+        # Records are only roughly ordered (threads, processes), so we start one block early
+        block: int = max(_bisect.bisect_right(self._block_times, start_ts) - 2, 0)
+        while block < len(offsets):
+            if self._block_times[block] > end_ts:
+                break
+            known_mask: int | None = self._block_masks.get(block)
+            if known_mask is not None and not known_mask & wanted_mask:
+                block += 1
+                continue
+            offset: int = offsets[block]
+            block_end: int = offsets[block + 1] if block + 1 < len(offsets) else self._size
+            if level_set is not None and not self.binary:
+                yield from self._find_levels(offset, block_end, level_set, start_ts, end_ts, min_level)
+                block += 1
+                continue
+            mask: int = 0
+            while offset < block_end:
+                created, levelno, next_offset = self._head_at(offset)
+                mask |= self._level_bit(levelno)
+                if (start_ts <= created <= end_ts and levelno >= min_level
+                        and (level_set is None or levelno in level_set)):
+                    yield self._entry_at(offset)
+                offset = next_offset
+            self._block_masks[block] = mask
+            block += 1
+
+    def _find_levels(self, start: int, end: int, level_set: frozenset[int], start_ts: float, end_ts: float,
+                     min_level: int) -> _ty.Iterator[StructuredLogEntry]:
+        """Finds records with exact levels in a jsonl block by searching for their level field."""
+        m = self._mmap
+        found: list[int] = []
+        for levelno in level_set:
+            if levelno < min_level:
+                continue
+            needle: bytes = b',"lvl":%d,' % levelno
+            pos: int = m.find(needle, start, end)
+            while pos != -1:
+                found.append(m.rfind(b"\n", start, pos) + 1 or start)
+                pos = m.find(needle, pos + len(needle), end)
+        for offset in sorted(found):
+            created, _, _ = self._head_at(offset)
+            if start_ts <= created <= end_ts:
+                yield self._entry_at(offset)
+
+    def first(self) -> StructuredLogEntry | None:
+        """Returns the first record of the file."""
+        if self._data_start >= self._size:
+            return None
+        return self._entry_at(self._data_start)
+
+    def last(self) -> StructuredLogEntry | None:
+        """Returns the last record of the file, only the last block is read."""
+        if self._data_start >= self._size:
+            return None
+        offset: int = self._sync(max(self._size - self.block_size, self._data_start))
+        last_offset: int = offset
+        while offset < self._size:
+            last_offset = offset
+            offset = self._head_at(offset)[2]
+        return self._entry_at(last_offset)
+
+class _BufferedFileHandler(_logging.FileHandler):
+    """
+    FileHandler that collects formatted records in memory and writes them out in one go once the buffer
+    reaches buffer_size characters, flush_interval seconds have passed or a record at or above
+    flush_level arrives.
+    """
+    def __init__(self, filename: str | PLPath, buffer_size: int = 65536, flush_interval: float = 1.0,
+                 flush_level: int = ERROR, encoding: str | None = "utf-8", binary: bool = False) -> None:
+        """
+        Initialize the buffered file handler.
+
+        :param filename: Path of the log file.
+        :param buffer_size: Number of buffered characters (roughly bytes for utf-8 text) that triggers a write,
+                            0 writes every record immediately.
+        :param flush_interval: Maximum time in seconds a record stays in the buffer.
+        :param flush_level: Records at or above this level get written out immediately.
+        :param encoding: Encoding of the log file.
+        :param binary: If the formatter returns bytes, used for the binary log format.
+        """
+        self.binary: bool = binary
+        if binary:
+            super().__init__(filename, mode="ab", encoding=None)
+            self.terminator = b""
+        else:
+            super().__init__(filename, encoding=encoding)
+        self.buffer_size: int = buffer_size
+        self.flush_interval: float = flush_interval
+        self.flush_level: int = flush_level
+        self._buffer: list[str | bytes] = []
+        self._buffered: int = 0
+        self._last_flush: float = time.monotonic()
+        self._stop_event: threading.Event = threading.Event()
+        self._flush_thread: threading.Thread | None = None
+        if buffer_size > 0 and flush_interval > 0:
+            self._flush_thread = threading.Thread(target=self._flush_loop, name="ActLoggerFileFlusher", daemon=True)
+            self._flush_thread.start()
+
+    def _flush_loop(self) -> None:
+        while not self._stop_event.wait(self.flush_interval):
+            if self._buffer and time.monotonic() - self._last_flush >= self.flush_interval:
+                self.flush()
+
+    def _add(self, record: _logging.LogRecord) -> None:
+        try:
+            msg: str | bytes = self.format(record) + self.terminator
+        except Exception:
+            self.handleError(record)
+            return
+        self._buffer.append(msg)
+        self._buffered += len(msg)
+
+    def _should_write(self, levelno: int) -> bool:
+        return (self._buffered >= self.buffer_size or levelno >= self.flush_level
+                or time.monotonic() - self._last_flush >= self.flush_interval)
+
+    def _write_buffer(self) -> None:
+        """Writes the buffer to the file, the handler lock has to be held."""
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        data: str | bytes = (b"" if self.binary else "").join(self._buffer)
+        self._buffer.clear()
+        self._buffered = 0
+        if self.stream is None:
+            self.stream = self._open()
+        self.stream.write(data)
+        self.stream.flush()
+
+    def _open(self):
+        stream = super()._open()
+        if self.binary and stream.tell() == 0:
+            stream.write(_BINARY_LOG_MAGIC)
+        return stream
+
+    def emit(self, record: _logging.LogRecord) -> None:
+        self._add(record)
+        if self._should_write(record.levelno):
+            try:
+                self._write_buffer()
+            except Exception:
+                self.handleError(record)
+
+    def emit_batch(self, records: list[_logging.LogRecord]) -> None:
+        """
+        Adds multiple records to the buffer at once, used by the asynchronous mode of the ActLogger.
+
+        :param records: The records to write.
+        """
+        self.acquire()
+        try:
+            for record in records:
+                self._add(record)
+            if self._should_write(max(record.levelno for record in records)):
+                self._write_buffer()
+        except Exception:
+            self.handleError(records[-1])
+        finally:
+            self.release()
+
+    def flush(self) -> None:
+        self.acquire()
+        try:
+            pending: int = len(self._buffer)
+            try:
+                self._write_buffer()
+            except Exception:
+                # There is no record at hand, so the lost batch gets reported through one that describes it
+                self.handleError(_logging.makeLogRecord({
+                    "msg": "%d buffered records could not be written to %s", "args": (pending, self.baseFilename),
+                    "levelno": ERROR, "levelname": "ERROR"}))
+        finally:
+            self.release()
+
+    def close(self) -> None:
+        self._stop_event.set()
+        self.flush()
+        super().close()
+
+    def _after_fork_in_child(self) -> None:
+        """The buffered records belong to the parent, which writes them itself."""
+        self._buffer.clear()
+        self._buffered = 0
+
+_LOG_SEGMENT_PATTERN: re.Pattern = re.compile(r"^\d{4}-\d{2}-\d{2}_\d{4}-\d{2}-\d{2}(#\d+)?\.\w+(\.gz)?$")
+_log_segment_counters: dict[str, int] = {}  # Last used '#n' per segment base path, saves probing
+
+def _next_log_segment_path(logs_dir: PLPath, date_name: str, suffix: str = ".log") -> PLPath:
+    """
+    Returns a free path for a rotated log segment named after its date range. Instead of scanning the logs
+    directory the '#n' names are probed one after another, if the unnumbered segment exists it gets
+    renamed to the next number so the order is kept.
+
+    :param logs_dir: The directory of the log segments.
+    :param date_name: The date range of the segment, e.g. 2024-01-01_2024-01-02.
+    :param suffix: The file suffix of the segment.
+    :return: The path for the new segment.
+    """
+    def taken(path: PLPath) -> bool:
+        return path.exists() or path.with_name(path.name + ".gz").exists()
+
+    def numbered(num: int) -> PLPath:
+        return logs_dir / f"{date_name}#{num}{suffix}"
+
+    base: PLPath = logs_dir / f"{date_name}{suffix}"
+    counter_key: str = str(base)
+    num: int = _log_segment_counters.get(counter_key, 0) + 1
+    if num == 1 and not taken(base) and not taken(numbered(1)):
+        return base
+    while taken(numbered(num)):
+        num += 1
+    for old_base in (base, base.with_name(base.name + ".gz")):
+        if old_base.exists():  # The unnumbered segment is the oldest one
+            os.rename(old_base, numbered(num).with_name(numbered(num).name + old_base.name[len(base.name):]))
+            num += 1
+            while taken(numbered(num)):
+                num += 1
+    _log_segment_counters[counter_key] = num
+    return numbered(num)
+
+class _RotatingFileHandler(_BufferedFileHandler):
+    """
+    Buffered file handler that cuts the log file into segments while the app is running, once it reaches
+    max_bytes or rotate_interval seconds have passed. Rotated segments are named after their date range like
+    at startup, compressed and pruned to the retention limits on a background thread.
+    """
+    def __init__(self, filename: str | PLPath, max_bytes: int = 0, rotate_interval: float = 0.0,
+                 backup_count: int = 0, compress: bool = False, buffer_size: int = 0, flush_interval: float = 1.0,
+                 flush_level: int = ERROR, encoding: str | None = "utf-8", binary: bool = False) -> None:
+        """
+        Initialize the rotating file handler.
+
+        :param filename: Path of the log file.
+        :param max_bytes: Size in bytes after which the file gets rotated, 0 disables size based rotation.
+        :param rotate_interval: Time in seconds after which the file gets rotated, 0 disables time based rotation.
+        :param backup_count: Maximum number of rotated segments to keep, 0 keeps all of them.
+        :param compress: If rotated segments get gzip compressed.
+        :param buffer_size: See _BufferedFileHandler.
+        :param flush_interval: See _BufferedFileHandler.
+        :param flush_level: See _BufferedFileHandler.
+        :param encoding: Encoding of the log file.
+        :param binary: If the formatter returns bytes.
+        """
+        super().__init__(filename, buffer_size, flush_interval, flush_level, encoding, binary)
+        self.max_bytes: int = max_bytes
+        self.rotate_interval: float = rotate_interval
+        self.backup_count: int = backup_count
+        self.compress: bool = compress
+        self._segment_bytes: int = os.path.getsize(self.baseFilename) if os.path.exists(self.baseFilename) else 0
+        self._segment_start: float | None = None
+        self._segment_end: float | None = None
+        self._pending_start: float | None = None
+        self._pending_end: float | None = None
+        self._next_rollover: float = time.time() + rotate_interval
+        self._maintenance_queue: SimpleQueue = SimpleQueue()
+        self._maintenance_thread: threading.Thread | None = None
+
+    def _add(self, record: _logging.LogRecord) -> None:
+        super()._add(record)
+        if self._pending_start is None:
+            self._pending_start = record.created
+        self._pending_end = record.created
+
+    def _should_rollover(self, size: int) -> bool:
+        if self._segment_bytes <= 0:
+            return False
+        if self.max_bytes > 0 and self._segment_bytes + size > self.max_bytes:
+            return True
+        return self.rotate_interval > 0 and time.time() >= self._next_rollover
+
+    def _write_buffer(self) -> None:
+        if self._buffer and self._should_rollover(self._buffered):
+            self.do_rollover()
+        size: int = self._buffered
+        super()._write_buffer()
+        self._segment_bytes += size
+        if self._segment_start is None:
+            self._segment_start = self._pending_start
+        if self._pending_end is not None:
+            self._segment_end = self._pending_end
+        self._pending_start = self._pending_end = None
+
+    def do_rollover(self) -> None:
+        """Renames the current file to a dated segment and starts a new one, the handler lock has to be held."""
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+        if self._segment_start is not None and self._segment_end is not None:
+            dates: tuple[str, str] | None = (_datetime.fromtimestamp(self._segment_start).strftime("%Y-%m-%d"),
+                                             _datetime.fromtimestamp(self._segment_end).strftime("%Y-%m-%d"))
+        else:  # The file existed before this handler was created
+            dates = IOManager._read_log_dates(PLPath(self.baseFilename))
+        if dates is None:
+            dates = (_datetime.now().strftime("%Y-%m-%d"),) * 2
+
+        log_file: PLPath = PLPath(self.baseFilename)
+        segment: PLPath = _next_log_segment_path(log_file.parent, f"{dates[0]}_{dates[1]}", log_file.suffix or ".log")
+        os.rename(log_file, segment)
+        self._segment_bytes = 0
+        self._segment_start = self._segment_end = None
+        self._next_rollover = time.time() + self.rotate_interval
+
+        if self.compress or self.backup_count > 0:
+            if self._maintenance_thread is None or not self._maintenance_thread.is_alive():
+                self._maintenance_thread = threading.Thread(target=self._maintenance_loop,
+                                                            name="ActLoggerRotation", daemon=True)
+                self._maintenance_thread.start()
+            self._maintenance_queue.put(segment)
+
+    def _maintenance_loop(self) -> None:
+        while True:
+            segment: PLPath | None = self._maintenance_queue.get()
+            if segment is None:
+                return
+            try:
+                if self.compress:
+                    with open(segment, "rb") as src, _gzip.open(f"{segment}.gz", "wb") as dst:
+                        _shutil.copyfileobj(src, dst, 1 << 20)
+                    os.remove(segment)
+                if self.backup_count > 0:
+                    self._prune(segment.parent)
+            except OSError:
+                pass
+
+    def _prune(self, logs_dir: PLPath) -> None:
+        """Removes the oldest segments exceeding the backup count."""
+        segments: list[os.DirEntry] = [entry for entry in os.scandir(logs_dir)
+                                       if entry.is_file() and _LOG_SEGMENT_PATTERN.match(entry.name)]
+        segments.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in segments[:max(len(segments) - self.backup_count, 0)]:
+            os.remove(entry.path)
+
+    def close(self) -> None:
+        super().close()
+        if self._maintenance_thread is not None and self._maintenance_thread.is_alive():
+            self._maintenance_queue.put(None)
+            self._maintenance_thread.join()
+
+_MESSAGE_VARIABLE_PATTERN: re.Pattern[str] = re.compile(
+    r"(?P<str>\"[^\"\n]*\"|(?<!\w)'[^'\n]*'(?!\w))"  # Quoted values, but not apostrophes
+    # Paths need a leading separator, drive letter, ./ or ~/, two separators or a file extension, so that
+    # "Read/write error" or "settings/config" stay as they are
+    r"|(?P<path>(?<![\w.~-])(?:[A-Za-z]:|~|\.{1,2})?(?:[\\/][\w.~$@%+-]+)+[\\/]?"  # Absolute, ./ and ~/ paths
+    r"|[\w.~-]+(?:[\\/][\w.~$@%+-]+){2,}[\\/]?"  # Relative paths with at least two separators
+    r"|[\w.~-]+[\\/][\w.~$@%+-]*\.[A-Za-z0-9]{1,8}\b)"  # Relative paths to a file with an extension
+    r"|(?P<hex>\b[0-9a-fA-F]{8}(?:-[0-9a-fA-F]{4}){3}-[0-9a-fA-F]{12}\b|\b0[xX][0-9a-fA-F]+\b"  # UUIDs, hex ids
+    r"|\b(?=[0-9a-fA-F]*\d)(?=[0-9a-fA-F]*[a-fA-F])[0-9a-fA-F]{6,}\b)"
+    r"|(?P<num>\d+)"  # Numbers, also inside words like file_123 and in timestamps
+)
+
+@_functools.lru_cache(maxsize=4096)
+def normalize_message(message: str) -> str:
+    """
+    Reduces a message to its template by replacing quoted values, paths, hex ids and numbers with placeholders,
+    so "failed to open file_123.tmp" and "failed to open file_124.tmp" both become "failed to open file_<num>.tmp".
+
+    :param message: The message.
+    :return: The template of the message.
+    """
+    return _MESSAGE_VARIABLE_PATTERN.sub(lambda match: f"<{match.lastgroup}>", message)
+
+class _RateLimitFilter(_logging.Filter):
+    """
+    Filter stage of the ActLogger that protects the handlers from floods of records. It supports token buckets
+    per message template (see normalize_message), probabilistic sampling and collapsing identical consecutive records into a
+    "last message repeated N times" record, all configured per level.
+    """
+    def __init__(self, rate_limits: dict[int, tuple[float, float]] | None = None,
+                 sample_rates: dict[int, float] | None = None, collapse_duplicates: bool = False,
+                 max_templates: int = 4096) -> None:
+        """
+        Initialize the filter.
+
+        :param rate_limits: Maps a level to (records per second, burst size), applied per message template.
+        :param sample_rates: Maps a level to the fraction of records that get kept, e.g. {DEBUG: 0.1}.
+        :param collapse_duplicates: If identical consecutive records get collapsed.
+        :param max_templates: Maximum number of tracked templates, the buckets get reset once it is exceeded and
+                              the records they suppressed until then are reported.
+        """
+        super().__init__()
+        self.rate_limits: dict[int, tuple[float, float]] = rate_limits or {}
+        self.sample_rates: dict[int, float] = sample_rates or {}
+        self.collapse_duplicates: bool = collapse_duplicates
+        self.max_templates: int = max_templates
+        self.emit: _ty.Callable[[_logging.LogRecord], _ty.Any] | None = None  # Used to emit the summary records
+        # [tokens, last refill, suppressed records, last suppressed record]
+        self._buckets: dict[tuple[int, str], list[_ty.Any]] = {}
+        self._lock: threading.Lock = threading.Lock()
+        self._last_key: tuple[int, str, str] | None = None
+        self._last_record: _logging.LogRecord | None = None
+        self._repeats: int = 0
+
+    @staticmethod
+    def _template(record: _logging.LogRecord) -> str:
+        return normalize_message(str(record.msg))
+
+    @staticmethod
+    def _summary(record: _logging.LogRecord, msg: str, args: tuple[_ty.Any, ...]) -> _logging.LogRecord:
+        summary = _logging.LogRecord(record.name, record.levelno, record.pathname, record.lineno, msg, args, None)
+        summary._dancer_summary = True
+        return summary
+
+    def _rate_limited_summary(self, key: tuple[int, str], bucket: list[_ty.Any]) -> _logging.LogRecord:
+        summary: _logging.LogRecord = self._summary(bucket[3], "%d messages like '%s' were rate limited",
+                                                    (int(bucket[2]), key[1]))
+        bucket[2], bucket[3] = 0, None
+        return summary
+
+    def _take_rate_limited_summaries(self) -> list[_logging.LogRecord]:
+        """Returns the summaries of all buckets that suppressed records since their last one, call with the lock."""
+        return [self._rate_limited_summary(key, bucket) for key, bucket in self._buckets.items() if bucket[2]]
+
+    def filter(self, record: _logging.LogRecord) -> bool:
+        if getattr(record, "_dancer_summary", False):
+            return True
+        levelno: int = record.levelno
+        sample_rate: float | None = self.sample_rates.get(levelno)
+        if sample_rate is not None and _random.random() >= sample_rate:
+            return False
+        limit: tuple[float, float] | None = self.rate_limits.get(levelno)
+        if limit is None and not self.collapse_duplicates:
+            return True
+
+        summaries: list[_logging.LogRecord] = []
+        keep: bool = True
+        with self._lock:
+            if limit is not None:
+                rate, burst = limit
+                template: str = self._template(record)
+                key: tuple[int, str] = (levelno, template)
+                now: float = time.monotonic()
+                bucket: list[_ty.Any] | None = self._buckets.get(key)
+                if bucket is None:
+                    if len(self._buckets) >= self.max_templates:
+                        summaries.extend(self._take_rate_limited_summaries())
+                        self._buckets.clear()
+                    bucket = self._buckets[key] = [burst, now, 0, None]
+                else:
+                    bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+                    bucket[1] = now
+                if bucket[0] < 1:
+                    bucket[2] += 1
+                    bucket[3] = record
+                    keep = False
+                else:
+                    bucket[0] -= 1
+                    if bucket[2]:
+                        summaries.append(self._rate_limited_summary(key, bucket))
+            if keep and self.collapse_duplicates:
+                dup_key: tuple[int, str, str] = (levelno, record.name, record.getMessage())
+                if dup_key == self._last_key:
+                    self._repeats += 1
+                    keep = False
+                else:
+                    if self._repeats:
+                        summaries.insert(0, self._summary(self._last_record, "last message repeated %d times",
+                                                          (self._repeats,)))
+                    self._last_key, self._last_record, self._repeats = dup_key, record, 0
+        if self.emit is not None:
+            for summary in summaries:
+                self.emit(summary)
+        return keep
+
+    def flush(self) -> None:
+        """Emits the pending "last message repeated" record and the counts of rate limited records."""
+        with self._lock:
+            summaries: list[_logging.LogRecord] = self._take_rate_limited_summaries()
+            if self._repeats:
+                summaries.insert(0, self._summary(self._last_record, "last message repeated %d times",
+                                                  (self._repeats,)))
+                self._last_key, self._last_record, self._repeats = None, None, 0
+        if self.emit is not None:
+            for summary in summaries:
+                self.emit(summary)
+
+class _ConnectionServer:
+    """
+    Accepts multiprocessing connections (a unix socket or a named pipe on windows) on a background thread and
+    passes every received message to a callback. Each connection gets its own reader thread.
+    """
+    def __init__(self, on_message: _ty.Callable[[_Connection, _ty.Any], None], name: str,
+                 authkey: bytes | None = None) -> None:
+        """
+        Start listening.
+
+        :param on_message: Called with the connection and the message for every received message.
+        :param name: Name prefix of the background threads.
+        :param authkey: Key child processes have to authenticate with, defaults to the process authkey
+                        which multiprocessing children inherit.
+        """
+        self.on_message: _ty.Callable[[_Connection, _ty.Any], None] = on_message
+        self.name: str = name
+        self.authkey: bytes = authkey or _multiprocessing.current_process().authkey
+        self._listener: _Listener = _Listener(authkey=self.authkey)
+        self.address: _ty.Any = self._listener.address
+        self._connections: list[_Connection] = []
+        self._closed: bool = False
+        self._accept_thread: threading.Thread = threading.Thread(target=self._accept_loop, name=f"{name}Accept",
+                                                                 daemon=True)
+        self._accept_thread.start()
+
+    def _accept_loop(self) -> None:
+        while not self._closed:
+            try:
+                conn: _Connection = self._listener.accept()
+            except (EOFError, _multiprocessing.AuthenticationError):  # A client failed the handshake
+                continue
+            except OSError:
+                return
+            if self._closed:
+                conn.close()
+                return
+            self._connections.append(conn)
+            threading.Thread(target=self._read_loop, args=(conn,), name=f"{self.name}Reader", daemon=True).start()
+
+    def _read_loop(self, conn: _Connection) -> None:
+        while True:
+            try:
+                message: _ty.Any = conn.recv()
+            except (EOFError, OSError):
+                break
+            self.on_message(conn, message)
+        conn.close()
+
+    def close(self) -> None:
+        """Stops accepting connections, connections that are still open stay readable."""
+        if self._closed:
+            return
+        self._closed = True
+        try:  # Wake up the accept call
+            _Client(self.address, authkey=self.authkey).close()
+        except OSError:
+            pass
+        self._accept_thread.join(1.0)
+        self._listener.close()
+
+_COLLECTOR_RECORD_FIELDS: tuple[str, ...] = ("name", "levelno", "levelname", "pathname", "filename", "module",
+                                             "lineno", "funcName", "created", "msecs", "relativeCreated",
+                                             "thread", "threadName", "process", "processName", "exc_text")
+
+class _LogCollector:
+    """
+    Receives records from child processes and writes them with a single writer thread. Records that arrive
+    together are put into timestamp order and tagged with the pid of their process.
+    """
+    _STOP: object = object()
+
+    def __init__(self, logger: _logging.Logger) -> None:
+        self.logger: _logging.Logger = logger
+        self._queue: SimpleQueue = SimpleQueue()
+        self._writer: threading.Thread = threading.Thread(target=self._write_loop, name="ActLoggerCollector",
+                                                          daemon=True)
+        self._writer.start()
+        self._server: _ConnectionServer = _ConnectionServer(lambda _, batch: self._queue.put(batch),
+                                                            "ActLoggerCollector")
+        self.address: _ty.Any = self._server.address
+
+    def _write_loop(self) -> None:
+        while True:
+            batches: list[_ty.Any] = [self._queue.get()]
+            try:
+                while True:
+                    batches.append(self._queue.get_nowait())
+            except Empty:
+                pass
+            stop: bool = any(batch is self._STOP for batch in batches)
+            records: list[dict[str, _ty.Any]] = [entry for batch in batches if batch is not self._STOP
+                                                 for entry in batch]
+            records.sort(key=lambda entry: entry["created"])
+            for entry in records:
+                record: _logging.LogRecord = _logging.makeLogRecord(entry)
+                record.msg = f"[{record.process}] {record.msg}"
+                self.logger.handle(record)
+            if stop:
+                return
+
+    def close(self) -> None:
+        self._server.close()
+        self._queue.put(self._STOP)
+        self._writer.join()
+
+class _CollectorClientHandler(_logging.Handler):
+    """
+    Handler used by child processes to send their records to the _LogCollector of the parent process.
+    Records are sent in batches by a background thread, so a log call never waits for the pipe.
+    """
+    _STOP: object = object()
+
+    def __init__(self, address: _ty.Any, authkey: bytes | None = None, batch_size: int = 512) -> None:
+        super().__init__()
+        self.batch_size: int = batch_size
+        self._conn: _Connection = _Client(address, authkey=authkey or _multiprocessing.current_process().authkey)
+        self._queue: SimpleQueue = SimpleQueue()
+        self._closed: bool = False
+        self._sender: threading.Thread = threading.Thread(target=self._send_loop, name="ActLoggerCollectorClient",
+                                                          daemon=True)
+        self._sender.start()
+
+    def _prepare(self, record: _logging.LogRecord) -> dict[str, _ty.Any]:
+        entry: dict[str, _ty.Any] = {field: getattr(record, field, None) for field in _COLLECTOR_RECORD_FIELDS}
+        entry["msg"] = record.getMessage()
+        if record.exc_info and not entry["exc_text"]:
+            entry["exc_text"] = (self.formatter or _logging.Formatter()).formatException(record.exc_info)
+        return entry
+
+    def handle(self, record: _logging.LogRecord) -> bool:
+        rv = self.filter(record)
+        if rv:
+            self.emit(record)
+        return rv
+
+    def emit(self, record: _logging.LogRecord) -> None:
+        try:
+            entry: dict[str, _ty.Any] = self._prepare(record)
+        except Exception:
+            self.handleError(record)
+            return
+        if self._closed:
+            self._send([entry])
+            return
+        self._queue.put(entry)
+
+    def _send(self, batch: list[_ty.Any]) -> None:
+        try:
+            self._conn.send(batch)
+        except (OSError, ValueError):  # The collector is gone, we fall back to stderr
+            for entry in batch:
+                _sys.__stderr__.write(f"[{entry['process']}] [{entry['levelname']}] {entry['msg']}\n")
+
+    def _send_loop(self) -> None:
+        while True:
+            batch: list[_ty.Any] = [self._queue.get()]
+            try:
+                while len(batch) < self.batch_size:
+                    batch.append(self._queue.get_nowait())
+            except Empty:
+                pass
+            markers: list[_ty.Any] = [entry for entry in batch if not isinstance(entry, dict)]
+            entries: list[dict[str, _ty.Any]] = [entry for entry in batch if isinstance(entry, dict)]
+            if entries:
+                self._send(entries)
+            for marker in markers:
+                if marker is self._STOP:
+                    return
+                marker.set()
+
+    def flush(self) -> None:
+        if self._closed or not self._sender.is_alive():
+            return
+        marker = threading.Event()
+        self._queue.put(marker)
+        marker.wait()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        if self._sender.is_alive():
+            self._queue.put(self._STOP)
+            self._sender.join()
+        leftovers: list[dict[str, _ty.Any]] = []
+        try:
+            while True:
+                entry = self._queue.get_nowait()
+                if isinstance(entry, dict):
+                    leftovers.append(entry)
+        except Empty:
+            pass
+        if leftovers:
+            self._send(leftovers)
+        self._conn.close()
+        super().close()
+
+    def _after_fork_in_child(self) -> None:
+        """The connection and the queued records belong to the parent, the sender thread did not survive the fork."""
+        self._closed = True
+        self._queue = SimpleQueue()
+
+class RingBufferEntry(_ty.NamedTuple):
+    """A formatted record kept by the RingBufferHandler, seq is its position in the stream of all records."""
+    seq: int
+    levelno: int
+    message: str
+
+class RingBufferHandler(_logging.Handler):
+    """
+    Keeps the last capacity formatted records in a ring of fixed size. Every record gets a sequence number,
+    consumers like UIs, status pages or tests keep a cursor and pull everything newer in batches through
+    read_since, at their own rate, instead of being called for every record.
+    """
+    def __init__(self, capacity: int = 10000, level: int = _logging.NOTSET) -> None:
+        """
+        Initialize the handler.
+
+        :param capacity: Number of records that are kept, older ones get overwritten.
+        :param level: Minimum level of the kept records.
+        """
+        if capacity <= 0:
+            raise ValueError("The capacity of the ring buffer has to be positive")
+        super().__init__(level)
+        self.capacity: int = capacity
+        self._ring: list[RingBufferEntry | None] = [None] * capacity
+        self._next_seq: int = 0
+
+    def _add(self, record: _logging.LogRecord) -> None:
+        """Formats the record into the ring, the handler lock has to be held."""
+        try:
+            message: str = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        seq: int = self._next_seq
+        self._ring[seq % self.capacity] = RingBufferEntry(seq, record.levelno, message)
+        self._next_seq = seq + 1
+
+    def emit(self, record: _logging.LogRecord) -> None:
+        self._add(record)  # handle() already holds the lock
+
+    def emit_batch(self, records: list[_logging.LogRecord]) -> None:
+        """
+        Adds multiple records at once, used by the asynchronous mode of the ActLogger.
+
+        :param records: The records to add.
+        """
+        self.acquire()
+        try:
+            for record in records:
+                self._add(record)
+        finally:
+            self.release()
+
+    @property
+    def cursor(self) -> int:
+        """The cursor after the newest record, to only read records that arrive from now on."""
+        return self._next_seq
+
+    def read_since(self, cursor: int = 0, max_n: int | None = None) -> tuple[list[RingBufferEntry], int]:
+        """
+        Returns the records starting at cursor. If some of them were already overwritten the batch starts with
+        the oldest kept record, which shows as a gap in the seq numbers.
+
+        :param cursor: The cursor returned by the last call, 0 to read everything that is kept.
+        :param max_n: Maximum number of returned records, None returns all.
+        :return: The records and the cursor to pass to the next call.
+        """
+        self.acquire()
+        try:
+            end: int = self._next_seq
+            start: int = max(cursor, end - self.capacity)
+            if max_n is not None:
+                end = min(end, start + max_n)
+            if start >= end:
+                return [], max(cursor, start)
+            capacity: int = self.capacity
+            first: int = start % capacity
+            last: int = first + (end - start)
+            if last <= capacity:
+                entries: list[RingBufferEntry] = self._ring[first:last]
+            else:  # Wraps around
+                entries = self._ring[first:] + self._ring[:last - capacity]
+        finally:
+            self.release()
+        return entries, end
+
+class NamespaceLogger:
+    """
+    Logger for one namespace of the ActLogger, e.g. "app.net", created through ActLogger.get_logger. Records go
+    to the handlers of the ActLogger. The level can be set per namespace (see ActLogger.set_namespace_level),
+    otherwise it is inherited from the parent namespace. The effective level is cached and refreshed by the
+    ActLogger whenever levels change, so disabled calls only cost an integer comparison, messages and their
+    arguments are only evaluated for enabled levels.
+    """
+    __slots__ = ("namespace", "_logger", "_level")
+
+    def __init__(self, namespace: str, logger: _logging.Logger) -> None:
+        self.namespace: str = namespace
+        self._logger: _logging.Logger = logger
+        self._level: int = logger.getEffectiveLevel()
+
+    def _refresh_level(self) -> None:
+        self._level = self._logger.getEffectiveLevel()
+
+    @property
+    def effective_level(self) -> int:
+        """The level of this namespace or the one it inherits."""
+        return self._level
+
+    def isEnabledFor(self, level: int) -> bool:
+        return level >= self._level and self._logger.isEnabledFor(level)
+
+    def log(self, level: int, message: str | _ty.Callable[[], str], *args: _ty.Any) -> None:
+        """
+        Log a message with a specific logging level.
+
+        :param level: The logging level of the message.
+        :param message: The message, a %-style format string for args or a callable that returns the message.
+        :param args: Arguments merged into the message with the % operator.
+        """
+        if level >= self._level:
+            self._logger.log(level, message() if callable(message) else message, *args)
+
+    def debug(self, message: str | _ty.Callable[[], str], *args: _ty.Any) -> None:
+        if DEBUG >= self._level:
+            self._logger.debug(message() if callable(message) else message, *args)
+
+    def info(self, message: str | _ty.Callable[[], str], *args: _ty.Any) -> None:
+        if INFO >= self._level:
+            self._logger.info(message() if callable(message) else message, *args)
+
+    def warning(self, message: str | _ty.Callable[[], str], *args: _ty.Any) -> None:
+        if WARNING >= self._level:
+            self._logger.warning(message() if callable(message) else message, *args)
+
+    def error(self, message: str | _ty.Callable[[], str], *args: _ty.Any) -> None:
+        if ERROR >= self._level:
+            self._logger.error(message() if callable(message) else message, *args)
+
+def _parse_level(level: int | str) -> int:
+    """
+    Turns a level name like "DEBUG" or a number into a level.
+
+    :param level: The level.
+    :return: The level as a number.
+    """
+    if isinstance(level, int):
+        return level
+    value: int | str = _logging.getLevelName(str(level).upper())
+    if not isinstance(value, int):
+        raise ValueError(f"Unknown logging level '{level}'")
+    return value
+
 # Copyright adalfarus
 class ActLogger(metaclass=SingletonMeta):
     """
@@ -88,48 +1474,153 @@ class ActLogger(metaclass=SingletonMeta):
         _logger: The logger instance used for logging messages.
         handlers: A list of handlers attached to the logger (console, file handlers).
     """
-    def __init__(self, name: str = "ActLogger", log_to_file: bool = False, filepath: str | PLPath = "app.log") -> None:
+    def __init__(self, name: str = "ActLogger", log_to_file: bool = False, filepath: str | PLPath = "app.log", *,
+                 async_mode: bool = False, file_buffer_size: int = 0, file_flush_interval: float = 1.0,
+                 file_flush_level: int = ERROR,
+                 log_format: _ty.Literal["text", "jsonl", "binary"] = "text", max_bytes: int = 0,
+                 rotate_interval: float = 0.0, backup_count: int = 0, compress_rotated: bool = False,
+                 rate_limits: dict[int, tuple[float, float]] | None = None,
+                 sample_rates: dict[int, float] | None = None, collapse_duplicates: bool = False,
+                 collector_address: _ty.Any = None, ring_buffer_size: int = 0) -> None:
         """
         Initialize the act logger.
 
         :param name: Name of the logger.
         :param log_to_file: Boolean indicating if logs should be written to a file.
         :param filepath: Path of the log file.
+        :param async_mode: If log calls should only enqueue the record, the console and file output is then
+                           formatted and written in batches by a background thread. Call close() to flush it.
+        :param file_buffer_size: If above 0 the file output gets buffered and only written once this many
+                                 characters are collected, file_flush_interval seconds have passed or a record
+                                 at or above file_flush_level is logged.
+        :param file_flush_interval: Maximum time in seconds a record stays in the file buffer.
+        :param file_flush_level: Records at or above this level get written to the file immediately.
+        :param log_format: Format of the log file, "jsonl" and "binary" can be read with the StructuredLogReader.
+                           The console output always stays text.
+        :param max_bytes: Rotate the log file once it reaches this size in bytes while running, 0 disables it.
+        :param rotate_interval: Rotate the log file every rotate_interval seconds while running, 0 disables it.
+        :param backup_count: Maximum number of rotated log segments to keep, 0 keeps all of them.
+        :param compress_rotated: If rotated log segments get gzip compressed on a background thread.
+        :param rate_limits: Maps a level to (records per second, burst size), each message template of that level
+                            gets its own token bucket. Suppressed records are reported once the template passes again.
+        :param sample_rates: Maps a level to the fraction of its records that are kept, e.g. {logging.DEBUG: 0.05}.
+        :param collapse_duplicates: Collapses identical consecutive records into "last message repeated N times".
+        :param collector_address: Address returned by start_collector() in the parent process. If given, this
+                                  (child) process sends all records to the parent instead of writing them itself.
+        :param ring_buffer_size: If above 0, the last ring_buffer_size formatted records are kept in memory and
+                                 can be pulled in batches with read_since.
         """
         self._logger = _logging.getLogger(name)
         self._logger.setLevel(_logging.DEBUG)
         # self._logger.addHandler(_logging.StreamHandler(_sys.__stdout__))
         self.handlers = []
+        self._dispatcher: _AsyncLogDispatcher | None = None
+        self._collector: _LogCollector | None = None
+        self._rate_limit_filter: _RateLimitFilter | None = None
+        self._ring_buffer: RingBufferHandler | None = None
+        self._namespaces: dict[str, NamespaceLogger] = {}
+        self._namespace_levels: dict[str, int] = {}
+        self._level_listeners: list[_ty.Callable[[], None]] = []
+        self._levels_lock: threading.Lock = threading.Lock()
+        self.levels_filepath: str | None = None
+        self._levels_watcher: threading.Thread | None = None
+        self._levels_watcher_stop: threading.Event = threading.Event()
+        self._pipe_redirects: list[_StreamToLogger] = []  # Created by create_pipe_redirect, restored after a fork
+        if rate_limits or sample_rates or collapse_duplicates:
+            self._rate_limit_filter = _RateLimitFilter(rate_limits, sample_rates, collapse_duplicates)
+            self._rate_limit_filter.emit = self._logger.handle
+            self._logger.addFilter(self._rate_limit_filter)
 
         # Create formatter with the desired format
-        formatter = _logging.Formatter(
-            '[%(asctime)s.%(msecs)03d] [%(levelname)s] %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
+        formatter = ActFormatter()
+
+        if collector_address is not None:
+            collector_handler = _CollectorClientHandler(collector_address)
+            self.handlers.append(collector_handler)
+            self._logger.addHandler(collector_handler)
+            atexit.register(self.close)
+            _mp_util.Finalize(self, self.close, exitpriority=100)  # Children skip atexit
+            self.logging_level: int = -1
+            return
 
         # Console handler
         console_handler = _logging.StreamHandler(_sys.__stdout__)
         console_handler.setFormatter(formatter)
-        self._logger.addHandler(console_handler)
         self.handlers.append(console_handler)
 
         # File handler (optional)
         if log_to_file:
-            file_handler = _logging.FileHandler(filepath, encoding='utf8')
-            file_handler.setFormatter(formatter)
-            self._logger.addHandler(file_handler)
+            if log_format not in ("text", "jsonl", "binary"):
+                raise ValueError(f"Unknown log format '{log_format}'")
+            if max_bytes > 0 or rotate_interval > 0:
+                file_handler = _RotatingFileHandler(filepath, max_bytes, rotate_interval, backup_count,
+                                                    compress_rotated, file_buffer_size, file_flush_interval,
+                                                    file_flush_level, encoding='utf8',
+                                                    binary=log_format == "binary")
+            elif file_buffer_size > 0 or log_format != "text":
+                file_handler = _BufferedFileHandler(filepath, file_buffer_size, file_flush_interval,
+                                                    file_flush_level, encoding='utf8',
+                                                    binary=log_format == "binary")
+            else:
+                file_handler = _logging.FileHandler(filepath, encoding='utf8')
+            file_handler.setFormatter({"text": formatter, "jsonl": _JSONLinesFormatter(),
+                                       "binary": _BinaryLogFormatter()}[log_format])
             self.handlers.append(file_handler)
+
+        if ring_buffer_size > 0:
+            self._ring_buffer = RingBufferHandler(ring_buffer_size)
+            self._ring_buffer.setFormatter(formatter)
+            self.handlers.append(self._ring_buffer)
+
+        if async_mode:
+            self._dispatcher = _AsyncLogDispatcher(list(self.handlers))
+            self._logger.addHandler(_QueueHandler(self._dispatcher))
+            atexit.register(self.close)
+        else:
+            for handler in self.handlers:
+                self._logger.addHandler(handler)
         self.logging_level: int = -1
 
-    def create_pipe_redirect(self, pipe: _ty.IO, level: int = _logging.INFO) -> _StreamToLogger:
+    def _after_fork_in_child(self) -> None:
+        """
+        Called in the child after a fork. The handlers, their buffers and the writer threads belong to the parent,
+        so they get detached from the logging.Logger and this instance is left without them. A new ActLogger
+        created in the child attaches its own handlers instead of adding them a second time. Streams redirected
+        to this logger get their original back, as there is no handler left to write their output.
+        """
+        for name in ("stdout", "stderr"):
+            stream: _ty.IO = getattr(sys, name)
+            if any(stream is redirect for redirect in self._pipe_redirects):
+                stream._reset_buffers()  # The partial lines are written by the parent
+                setattr(sys, name, stream.original_stream)
+        self._pipe_redirects = []
+        for handler in (*self._logger.handlers, *self.handlers):
+            self._logger.removeHandler(handler)
+            hook: _ty.Callable[[], None] | None = getattr(handler, "_after_fork_in_child", None)
+            if hook is not None:
+                hook()
+        if self._rate_limit_filter is not None:
+            for namespace_logger in (self._logger, *(ns._logger for ns in self._namespaces.values())):
+                namespace_logger.removeFilter(self._rate_limit_filter)
+        self.handlers = []
+        self._dispatcher = None
+        self._collector = None
+        self._rate_limit_filter = None
+        self._ring_buffer = None
+
+    def create_pipe_redirect(self, pipe: _ty.IO, level: int = _logging.INFO,
+                             max_line_length: int = 65536) -> _StreamToLogger:
         """
         Return a stream wrapper that redirects writes to the logger.
 
         :param pipe: The original stream (e.g., sys.stdout, a file, etc.)
         :param level: Logging level to use
+        :param max_line_length: Maximum length of a buffered partial line before it gets logged in chunks
         :return: _StreamToLogger instance
         """
-        return _StreamToLogger(self._logger, level, pipe)
+        redirect: _StreamToLogger = _StreamToLogger(self._logger, level, pipe, max_line_length)
+        self._pipe_redirects.append(redirect)
+        return redirect
 
     def restore_pipe(self, replacement: _StreamToLogger) -> _ty.IO:
         """
@@ -137,73 +1628,348 @@ class ActLogger(metaclass=SingletonMeta):
 
         :param replacement: The _StreamToLogger that was used to override it.
         """
+        self._pipe_redirects = [redirect for redirect in self._pipe_redirects if redirect is not replacement]
         return replacement.restore()
 
     def add_handler(self, mirror_to_io: io.IOBase) -> None:
+        """
+        Attaches another handler to the logger. Even in async mode it is called on the logging thread,
+        so handlers that e.g. update widgets keep working.
+        """
         self.handlers.append(mirror_to_io)
         self._logger.addHandler(mirror_to_io)
 
-    def log(self, level: int, message: str) -> None:
-        """Log a message with a specific logging level."""
-        self._logger.log(level, message)
+    def read_since(self, cursor: int = 0, max_n: int | None = None) -> tuple[list[RingBufferEntry], int]:
+        """
+        Returns the records kept in the ring buffer starting at cursor, see RingBufferHandler.read_since.
+
+        :param cursor: The cursor returned by the last call, 0 to read everything that is kept.
+        :param max_n: Maximum number of returned records, None returns all.
+        :return: The records and the cursor to pass to the next call.
+        """
+        if self._ring_buffer is None:
+            raise RuntimeError("The ActLogger was created without a ring buffer, pass ring_buffer_size")
+        return self._ring_buffer.read_since(cursor, max_n)
+
+    def start_collector(self) -> _ty.Any:
+        """
+        Lets child processes send their records to this logger, which writes them with a single writer thread,
+        ordered by time and tagged with their pid. Pass the returned address to ActLogger(collector_address=...)
+        in the children, they have to be started through multiprocessing so they share the authkey.
+
+        :return: The address of the collector.
+        """
+        if self._collector is None:
+            self._collector = _LogCollector(self._logger)
+        return self._collector.address
+
+    def stop_collector(self) -> None:
+        """Stops the collector and writes the records that were already received."""
+        if self._collector is not None:
+            self._collector.close()
+            self._collector = None
+
+    def flush(self, timeout: float | None = None) -> None:
+        """
+        Makes sure every record logged until now has been written out.
+
+        :param timeout: Maximum time to wait for the writer thread in async mode, None waits forever.
+        """
+        if self._rate_limit_filter is not None:
+            self._rate_limit_filter.flush()
+        if self._dispatcher is not None:
+            self._dispatcher.flush(timeout)
+        for handler in self.handlers:
+            handler.flush()
+
+    def close(self) -> None:
+        """
+        Flushes all output, stops the writer thread in async mode and closes the file handlers.
+        Logging afterwards still works, but is done synchronously.
+        """
+        self._levels_watcher_stop.set()
+        self.stop_collector()
+        if self._rate_limit_filter is not None:
+            self._rate_limit_filter.flush()
+        if self._dispatcher is not None:
+            self._dispatcher.close()
+        for handler in self.handlers:
+            handler.flush()
+            if isinstance(handler, (_logging.FileHandler, _CollectorClientHandler)):
+                handler.close()
+
+    def log(self, level: int, message: str | _ty.Callable[[], str], *args: _ty.Any) -> None:
+        """
+        Log a message with a specific logging level.
+
+        :param level: The logging level of the message.
+        :param message: The message, a %-style format string for args or a callable that returns the message.
+                        Both only get evaluated if the level is enabled.
+        :param args: Arguments merged into the message with the % operator.
+        """
+        if self._logger.isEnabledFor(level):
+            self._logger.log(level, message() if callable(message) else message, *args)
 
     # Convenience methods for different logging levels
-    def info(self, message: str) -> None:
+    def info(self, message: str | _ty.Callable[[], str], *args: _ty.Any) -> None:
         """
         Log an informational message.
 
         :param message: The message to log at the INFO level. Typically used for
                         general application progress or operational messages.
+        :param args: Lazily merged %-style arguments, see log().
         """
-        self._logger.info(message)
+        if self._logger.isEnabledFor(INFO):
+            self._logger.info(message() if callable(message) else message, *args)
 
-    def debug(self, message: str) -> None:
+    def debug(self, message: str | _ty.Callable[[], str], *args: _ty.Any) -> None:
         """
         Log a debug message.
 
         :param message: The message to log at the DEBUG level. Typically used for
                         detailed information useful for diagnosing issues or tracing execution flow.
+        :param args: Lazily merged %-style arguments, see log().
         """
-        self._logger.debug(message)
+        if self._logger.isEnabledFor(DEBUG):
+            self._logger.debug(message() if callable(message) else message, *args)
 
-    def error(self, message: str) -> None:
+    def error(self, message: str | _ty.Callable[[], str], *args: _ty.Any) -> None:
         """
         Log an error message.
 
         :param message: The message to log at the ERROR level. Typically used to
                         indicate a significant issue or error in the application.
+        :param args: Lazily merged %-style arguments, see log().
         """
-        self._logger.error(message)
+        if self._logger.isEnabledFor(ERROR):
+            self._logger.error(message() if callable(message) else message, *args)
 
-    def warning(self, message: str) -> None:
+    def warning(self, message: str | _ty.Callable[[], str], *args: _ty.Any) -> None:
         """
         Log a warning message.
 
         :param message: The message to log at the WARNING level. Typically used to
                         indicate a slight issue or warn about an action.
+        :param args: Lazily merged %-style arguments, see log().
         :return:
         """
-        self._logger.warning(message)
+        if self._logger.isEnabledFor(WARNING):
+            self._logger.warning(message() if callable(message) else message, *args)
 
     def setLevel(self, logging_level: int) -> None:
         self._logger.setLevel(logging_level)
         self.logging_level = logging_level
+        self._notify_level_listeners()
+
+    def get_logger(self, namespace: str) -> NamespaceLogger:
+        """
+        Returns the logger of a namespace like "app.net", its records go to the handlers of this logger.
+        Dots separate the levels of the hierarchy, a namespace without its own level uses the one of its parent.
+        Levels have to be changed through the ActLogger, which refreshes the cached levels of the namespaces.
+
+        :param namespace: The namespace.
+        :return: The NamespaceLogger.
+        """
+        namespace_logger: NamespaceLogger | None = self._namespaces.get(namespace)
+        if namespace_logger is None:
+            logger: _logging.Logger = _logging.getLogger(f"{self._logger.name}.{namespace}")
+            if self._rate_limit_filter is not None and self._rate_limit_filter not in logger.filters:
+                logger.addFilter(self._rate_limit_filter)  # Logger filters are not applied to propagated records
+            namespace_logger = self._namespaces.setdefault(namespace, NamespaceLogger(namespace, logger))
+        return namespace_logger
+
+    def set_namespace_level(self, namespace: str, level: int | str | None) -> None:
+        """
+        Sets the level of a namespace and the namespaces below it that have no own level.
+
+        :param namespace: The namespace, "" is this logger itself.
+        :param level: The level or its name, None makes the namespace inherit the level of its parent again.
+        """
+        if not namespace:
+            if level is not None:
+                self.setLevel(_parse_level(level))
+            return
+        logger: _logging.Logger = _logging.getLogger(f"{self._logger.name}.{namespace}")
+        if level is None:
+            self._namespace_levels.pop(namespace, None)
+            logger.setLevel(_logging.NOTSET)
+        else:
+            self._namespace_levels[namespace] = _parse_level(level)
+            logger.setLevel(self._namespace_levels[namespace])  # Also clears the cached level lookups
+        self._notify_level_listeners()
+
+    def get_namespace_levels(self) -> dict[str, int]:
+        """Returns the namespaces that have their own level."""
+        return dict(self._namespace_levels)
+
+    def add_level_listener(self, listener: _ty.Callable[[], None]) -> None:
+        """
+        Adds a callable that gets invoked after levels have been changed, e.g. to update cached level checks.
+
+        :param listener: The callable.
+        """
+        self._level_listeners.append(listener)
+
+    def _notify_level_listeners(self) -> None:
+        for namespace_logger in tuple(self._namespaces.values()):
+            namespace_logger._refresh_level()
+        for listener in tuple(self._level_listeners):
+            listener()
+
+    @staticmethod
+    def _default_levels_filepath() -> str:
+        base_app_dir: str | None = getattr(config, "base_app_dir", None)
+        return os.path.join(base_app_dir or os.getcwd(), "config", "log_levels.json")
+
+    def load_levels(self, filepath: str | None = None) -> None:
+        """
+        Loads the levels from a JSON file like {"": "INFO", "dancer.io": "WARNING", "app.net": "DEBUG"}, where ""
+        is this logger itself. Namespaces that are not in the file inherit the level of their parent again.
+
+        :param filepath: The file, defaults to levels_filepath or config/log_levels.json in the app directory.
+        """
+        filepath = filepath or self.levels_filepath or self._default_levels_filepath()
+        with open(filepath, "r", encoding="utf-8") as f:
+            data: _ty.Any = _json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError(f"{filepath} has to contain an object of namespaces and levels")
+        levels: dict[str, int] = {namespace: _parse_level(level) for namespace, level in data.items()}
+        with self._levels_lock:
+            root_level: int | None = levels.pop("", None)
+            if root_level is not None:
+                self._logger.setLevel(root_level)
+                self.logging_level = root_level
+            for namespace in self._namespace_levels.keys() - levels.keys():
+                _logging.getLogger(f"{self._logger.name}.{namespace}").setLevel(_logging.NOTSET)
+            for namespace, level in levels.items():
+                _logging.getLogger(f"{self._logger.name}.{namespace}").setLevel(level)
+            self._namespace_levels = levels
+        self._notify_level_listeners()
+
+    def _reload_levels(self) -> None:
+        try:
+            self.load_levels()
+        except (OSError, ValueError) as e:
+            self.error("Could not reload the logging levels: %s", e)
+        else:
+            self.info("Reloaded the logging levels from %s", self.levels_filepath)
+
+    def enable_level_reload(self, filepath: str | None = None, poll_interval: float = 0.0) -> None:
+        """
+        Loads the levels from filepath (see load_levels) and reloads them on SIGUSR1, where available and no other
+        handler is installed for it, and, if poll_interval is above 0, when the modification time of the file changes.
+
+        :param filepath: The file, defaults to config/log_levels.json in the app directory.
+        :param poll_interval: Seconds between checks of the modification time, 0 disables polling.
+        """
+        self.levels_filepath = filepath or self.levels_filepath or self._default_levels_filepath()
+        if (hasattr(_signal, "SIGUSR1") and threading.current_thread() is threading.main_thread()
+                and _signal.getsignal(_signal.SIGUSR1) in (_signal.SIG_DFL, None)):
+            # The reload runs on its own thread, the signal handler may have interrupted a logging call
+            _signal.signal(_signal.SIGUSR1, lambda *_: threading.Thread(target=self._reload_levels,
+                                                                        name="ActLoggerLevelReload",
+                                                                        daemon=True).start())
+        mtime: int | None = self._levels_mtime()
+        if mtime is not None:
+            self._reload_levels()
+        if poll_interval > 0 and self._levels_watcher is None:
+            self._levels_watcher = threading.Thread(target=self._watch_levels, args=(poll_interval, mtime),
+                                                    name="ActLoggerLevelWatcher", daemon=True)
+            self._levels_watcher.start()
+
+    def _levels_mtime(self) -> int | None:
+        try:
+            return os.stat(self.levels_filepath).st_mtime_ns
+        except OSError:
+            return None
+
+    def _watch_levels(self, poll_interval: float, last_mtime: int | None) -> None:
+        while not self._levels_watcher_stop.wait(poll_interval):
+            mtime: int | None = self._levels_mtime()
+            if mtime != last_mtime:
+                last_mtime = mtime
+                if mtime is not None:
+                    self._reload_levels()
 
 # Copyright zScout
 T = _ty.TypeVar("T")
 class OrderedSet(_ty.Generic[T]):
     # Docs generated with Github Copilot
+    _REMOVED: _ty.Any = object()  # Tombstone left behind by discard until the next compaction
+
     def __init__(self, iterable: _ty.Iterable = None) -> None:
         """
         OrderedSet is a hybrid of list and set. It maintains the order of elements like a list and ensures that each
-        element is unique like a set. It is implemented using a list and a set. The list maintains the order of elements
-        and the set ensures that each element is unique. The list is used to maintain the order of elements and the set is
-        used to check if an element is already present in the OrderedSet."""
+        element is unique like a set. It is implemented using a list and a dict. The list maintains the order of
+        elements and the dict maps every element to its slot in the list, so adding, removing and checking for an
+        element are O(1). Removed elements leave a tombstone in the list, which gets compacted once they make up
+        half of it. A Fenwick tree counts the live slots, so the index of an element and the element at an index
+        are found in O(log n) without compacting."""
         self._items: list[T] = []
-        self._seen: set[T] = set()
+        self._index: dict[T, int] = {}
+        self._tree: list[int] = [0]  # 1-based Fenwick tree over the slots, 1 for a live slot and 0 for a tombstone
+        self._removed: int = 0
         if iterable:
-            for item in iterable:
-                self.add(item)
+            self._set_unique(list(dict.fromkeys(iterable)))
+
+    def _set_unique(self, items: list[T]) -> None:
+        """Replaces the contents with a list of unique items."""
+        self._items = items
+        self._index = dict(zip(items, range(len(items))))
+        size: int = len(items)
+        tree: list[int] = [0] + [1] * size
+        for i in range(1, size + 1):
+            parent: int = i + (i & -i)
+            if parent <= size:
+                tree[parent] += tree[i]
+        self._tree = tree
+        self._removed = 0
+
+    @classmethod
+    def _from_unique(cls, items: list[T]) -> "OrderedSet[T]":
+        new_set: OrderedSet[T] = cls.__new__(cls)
+        new_set._set_unique(items)
+        return new_set
+
+    def _compact(self) -> None:
+        """Removes all tombstones, this builds a new list so running iterators keep walking the old one."""
+        if self._removed:
+            self._set_unique([item for item in self._items if item is not self._REMOVED])
+
+    def _append_slot(self) -> None:
+        """Adds the node of a new live slot at the end of the Fenwick tree."""
+        tree: list[int] = self._tree
+        i: int = len(tree)
+        total: int = 1
+        j: int = i - 1
+        stop: int = i - (i & -i)
+        while j > stop:  # The node covers the slots (stop, i]
+            total += tree[j]
+            j -= j & -j
+        tree.append(total)
+
+    def _rank(self, position: int) -> int:
+        """Returns the number of live slots before position."""
+        tree: list[int] = self._tree
+        count: int = 0
+        while position > 0:
+            count += tree[position]
+            position -= position & -position
+        return count
+
+    def _select(self, index: int) -> int:
+        """Returns the slot of the live element with the given index."""
+        tree: list[int] = self._tree
+        position: int = 0
+        remaining: int = index + 1
+        step: int = 1 << (len(tree) - 1).bit_length()
+        while step:
+            next_position: int = position + step
+            if next_position < len(tree) and tree[next_position] < remaining:
+                position = next_position
+                remaining -= tree[next_position]
+            step >>= 1
+        return position
 
     def add(self, item: T) -> None:
         """
@@ -211,9 +1977,10 @@ class OrderedSet(_ty.Generic[T]):
         :param item: The item to be added to the OrderedSet.
         :return: None
         """
-        if item not in self._seen:
+        if item not in self._index:
+            self._index[item] = len(self._items)
             self._items.append(item)
-            self._seen.add(item)
+            self._append_slot()
 
     def discard(self, item: T) -> None:
         """
@@ -221,9 +1988,27 @@ class OrderedSet(_ty.Generic[T]):
         :param item: The item to be removed from the OrderedSet.
         :return: None
         """
-        if item in self._seen:
-            self._items.remove(item)
-            self._seen.remove(item)
+        position: int | None = self._index.pop(item, None)
+        if position is None:
+            return
+        items: list[T] = self._items
+        tree: list[int] = self._tree
+        if position == len(items) - 1:  # Nodes only cover slots before them, so the last ones can just be dropped
+            items.pop()
+            tree.pop()
+            while items and items[-1] is self._REMOVED:
+                items.pop()
+                tree.pop()
+                self._removed -= 1
+            return
+        items[position] = self._REMOVED
+        i: int = position + 1
+        while i < len(tree):
+            tree[i] -= 1
+            i += i & -i
+        self._removed += 1
+        if self._removed > 32 and self._removed * 2 > len(items):
+            self._compact()
 
     def remove(self, item: T) -> None:
         """
@@ -232,7 +2017,7 @@ class OrderedSet(_ty.Generic[T]):
         :param item: The item to be removed from the OrderedSet.
         :return: None
         """
-        if item not in self._seen:
+        if item not in self._index:
             raise KeyError(f"{item} not in OrderedSet")
         self.discard(item)
 
@@ -241,8 +2026,10 @@ class OrderedSet(_ty.Generic[T]):
         Removes all items from the OrderedSet.
         :return: None
         """
-        self._items.clear()
-        self._seen.clear()
+        self._items = []
+        self._index.clear()
+        self._tree = [0]
+        self._removed = 0
 
     def get_index(self, item: T) -> int:
         """
@@ -250,7 +2037,10 @@ class OrderedSet(_ty.Generic[T]):
         :param item: The item whose index is to be returned.
         :return: The index of the item in the OrderedSet.
         """
-        return self._items.index(item)
+        position: int | None = self._index.get(item)
+        if position is None:
+            raise ValueError(f"{item} is not in OrderedSet")
+        return self._rank(position) if self._removed else position
 
     def get_by_index(self, index: int) -> T:
         """
@@ -258,21 +2048,29 @@ class OrderedSet(_ty.Generic[T]):
         :param index: The index of the item to be returned.
         :return: The item at the given index in the OrderedSet.
         """
-        return self._items[index]
+        if not self._removed:
+            return self._items[index]
+        size: int = len(self._index)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("OrderedSet index out of range")
+        return self._items[self._select(index)]
 
     def to_list(self) -> list[T]:
         """
         Returns the items in the OrderedSet as a list.
         :return: The items in the OrderedSet as a list.
         """
-        return self._items
+        self._compact()
+        return list(self._items)
 
     def to_set(self) -> set[T]:
         """
         Returns the items in the OrderedSet as a set.
         :return: The items in the OrderedSet as a set.
         """
-        return self._seen
+        return set(self._index)
 
     @staticmethod
     def from_list(lst: _ty.List[T]) -> 'OrderedSet':
@@ -287,14 +2085,17 @@ class OrderedSet(_ty.Generic[T]):
         Returns the number of items in the OrderedSet.
         :return: The number of items in the OrderedSet.
         """
-        return len(self._items)
+        return len(self._index)
 
     def __iter__(self):
         """
         Returns an iterator over the items in the OrderedSet.
         :return: An iterator over the items in the OrderedSet.
         """
-        return iter(self._items)
+        self._compact()
+        removed: _ty.Any = self._REMOVED
+        # discard may leave tombstones in the list while we are iterating over it
+        return (item for item in self._items if item is not removed)
 
     def __contains__(self, item: T):
         """
@@ -302,13 +2103,14 @@ class OrderedSet(_ty.Generic[T]):
         :param item: The item to be checked for presence in the OrderedSet.
         :return: True if the item is present in the OrderedSet, False otherwise.
         """
-        return item in self._seen
+        return item in self._index
 
     def __repr__(self):
         """
         Returns a string representation of the OrderedSet.
         :return: A string representation of the OrderedSet.
         """
+        self._compact()
         return f"OrderedSet({self._items})"
 
     def __eq__(self, other):
@@ -318,6 +2120,8 @@ class OrderedSet(_ty.Generic[T]):
         :return: True if the OrderedSet is equal to the other OrderedSet, False otherwise.
         """
         if isinstance(other, OrderedSet):
+            self._compact()
+            other._compact()
             return self._items == other._items
         return False
 
@@ -329,7 +2133,7 @@ class OrderedSet(_ty.Generic[T]):
         """
         if not isinstance(other, (OrderedSet, set)):
             return NotImplemented
-        return OrderedSet(self._items + [item for item in other if item not in self])
+        return OrderedSet._from_unique(list({**self._index, **dict.fromkeys(other)}))
 
     def __and__(self, other):
         """
@@ -339,7 +2143,8 @@ class OrderedSet(_ty.Generic[T]):
         """
         if not isinstance(other, (OrderedSet, set)):
             return NotImplemented
-        return OrderedSet(item for item in self if item in other)
+        lookup = other._index if isinstance(other, OrderedSet) else other
+        return OrderedSet._from_unique([item for item in self._index if item in lookup])
 
     def __sub__(self, other):
         """
@@ -349,7 +2154,8 @@ class OrderedSet(_ty.Generic[T]):
         """
         if not isinstance(other, (OrderedSet, set)):
             return NotImplemented
-        return OrderedSet(item for item in self if item not in other)
+        lookup = other._index if isinstance(other, OrderedSet) else other
+        return OrderedSet._from_unique([item for item in self._index if item not in lookup])
 
 # Copyright zScout
 S = _ty.TypeVar("S")
@@ -386,16 +2192,360 @@ class StaticContainer(_ty.Generic[S]):
         """
         self._value = None
 
-# Copyright zScout  TODO: Refactor, title etc are just wrongly ordered in the methods and adding support for custom icons; Or also ignoring msgs with only small changes?
+_IO_LEVEL_BITS: dict[int, int] = {DEBUG: 1, INFO: 2, WARNING: 4, ERROR: 8}
+
+_PROMPT_SEVERITIES: dict[str, int] = {"error": 0, "warning": 1, "question": 2, "information": 3, "debug": 4}
+
+class _QueuedPrompt:
+    """A pending prompt of the IOManager, count is the number of identical prompts merged into it."""
+    __slots__ = ("key", "title", "text", "description", "level", "custom_options", "count")
+
+    def __init__(self, key: tuple[str, str, str], title: str, text: str, description: str, level: str,
+                 custom_options: _ty.Dict[str, _ty.Callable] | None) -> None:
+        self.key: tuple[str, str, str] = key
+        self.title: str = title
+        self.text: str = text
+        self.description: str = description
+        self.level: str = level
+        self.custom_options: _ty.Dict[str, _ty.Callable] | None = custom_options
+        self.count: int = 1
+
+class _PromptRequest:
+    """A prompt_user call waiting for the UI thread, the answer is set on future."""
+    __slots__ = ("title", "text", "description", "level", "options", "default_option", "checkbox_label", "future")
+
+    def __init__(self, title: str, text: str, description: str, level: str, options: list[str],
+                 default_option: str, checkbox_label: str | None,
+                 future: "_Future[tuple[str | None, bool]]") -> None:
+        self.title: str = title
+        self.text: str = text
+        self.description: str = description
+        self.level: str = level
+        self.options: list[str] = options
+        self.default_option: str = default_option
+        self.checkbox_label: str | None = checkbox_label
+        self.future: _Future[tuple[str | None, bool]] = future
+
+class _PromptQueue:
+    """
+    Queue of pending IOManager prompts. Identical prompts (same title, normalized text and level) get merged into one entry
+    with a count, entries are handed out by severity (errors first) and the number of entries is capped, dropped
+    prompts are counted in overflow.
+
+    Requests of prompt_user are never merged or dropped and are handed out before all other prompts.
+
+    Any thread may put prompts, they are taken out by the UI thread. put and rearm report whether the consumer
+    has to be woken up, so only one wakeup is pending at any time.
+    """
+    def __init__(self, max_size: int = 256) -> None:
+        """
+        Initialize the prompt queue.
+
+        :param max_size: Maximum number of distinct queued prompts.
+        """
+        self.max_size: int = max_size
+        self.overflow: int = 0
+        self._queues: list[_deque[_QueuedPrompt]] = [_deque() for _ in range(len(_PROMPT_SEVERITIES))]
+        self._entries: dict[tuple[str, str, str], _QueuedPrompt] = {}
+        self._requests: _deque[_PromptRequest] = _deque()
+        self._lock: threading.Lock = threading.Lock()
+        self._wakeup_pending: bool = False
+
+    def put(self, title: str, text: str, description: str, level: str,
+            custom_options: _ty.Dict[str, _ty.Callable] | None = None) -> bool:
+        """
+        Queues a prompt or increases the count of a queued prompt that only differs in the variable parts of the text.
+
+        :param title: Title of the prompt.
+        :param text: Text of the prompt.
+        :param description: Description of the prompt.
+        :param level: Level of the prompt, decides the order.
+        :param custom_options: Additional buttons of the prompt.
+        :return: If the consumer needs to be woken up.
+        """
+        key: tuple[str, str, str] = (title, normalize_message(text), level)
+        with self._lock:
+            entry: _QueuedPrompt | None = self._entries.get(key)
+            if entry is not None:
+                entry.count += 1
+                return False  # Already queued, so a wakeup is pending or the consumer is busy and will rearm
+            severity: int = _PROMPT_SEVERITIES.get(level, len(_PROMPT_SEVERITIES) - 1)
+            if len(self._entries) >= self.max_size:
+                # Make room by dropping the newest prompt of the least severe level, if it is less severe than this one
+                for queue in reversed(self._queues[severity + 1:]):
+                    if queue:
+                        dropped: _QueuedPrompt = queue.pop()
+                        del self._entries[dropped.key]
+                        self.overflow += dropped.count
+                        break
+                else:
+                    self.overflow += 1
+                    return False
+            entry = _QueuedPrompt(key, title, text, description, level, custom_options)
+            self._entries[key] = entry
+            self._queues[severity].append(entry)
+            if self._wakeup_pending:
+                return False
+            self._wakeup_pending = True
+            return True
+
+    def put_request(self, request: _PromptRequest) -> bool:
+        """
+        Queues a prompt_user request.
+
+        :param request: The request.
+        :return: If the consumer needs to be woken up.
+        """
+        with self._lock:
+            self._requests.append(request)
+            if self._wakeup_pending:
+                return False
+            self._wakeup_pending = True
+            return True
+
+    def pop(self) -> _QueuedPrompt | _PromptRequest | None:
+        """
+        Returns the oldest request or else the oldest prompt of the most severe level.
+
+        :return: The prompt or None if the queue is empty.
+        """
+        with self._lock:
+            if self._requests:
+                return self._requests.popleft()
+            for queue in self._queues:
+                if queue:
+                    entry: _QueuedPrompt = queue.popleft()
+                    del self._entries[entry.key]
+                    return entry
+        return None
+
+    def take_overflow(self) -> int:
+        """
+        Returns the number of dropped prompts and resets it.
+
+        :return: The number of prompts dropped since the last call.
+        """
+        with self._lock:
+            overflow, self.overflow = self.overflow, 0
+        return overflow
+
+    def rearm(self) -> bool:
+        """
+        Called by the consumer after it handled a prompt, resets the pending wakeup.
+
+        :return: If prompts are left, in which case a new wakeup is pending and the consumer should be woken up.
+        """
+        with self._lock:
+            self._wakeup_pending = bool(self._entries or self._requests)
+            return self._wakeup_pending
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries) + len(self._requests)
+
+_PROMPT_SERVICE_ENV_VAR: str = "DANCER_PROMPT_SERVICE"
+
+class _PromptClient:
+    """
+    Connection of a child process to the prompt service of the UI process (see IOManager.start_prompt_service).
+    Requests are sent as (request id, prompt_user arguments), a reader thread resolves the futures with the
+    (request id, answer, error) replies.
+    """
+    def __init__(self, address: _ty.Any, authkey: bytes | None = None) -> None:
+        """
+        Connect to the prompt service.
+
+        :param address: Address of the prompt service.
+        :param authkey: Key to authenticate with, defaults to the process authkey.
+        """
+        self.pid: int = os.getpid()
+        self.closed: bool = False
+        self._conn: _Connection = _Client(address, authkey=authkey or _multiprocessing.current_process().authkey)
+        self._futures: dict[int, _Future[tuple[str | None, bool]]] = {}
+        self._next_id: int = 0
+        self._lock: threading.Lock = threading.Lock()
+        self._reader: threading.Thread = threading.Thread(target=self._read_loop, name="IOManagerPromptClient",
+                                                          daemon=True)
+        self._reader.start()
+
+    def request(self, arguments: tuple[_ty.Any, ...]) -> "_Future[tuple[str | None, bool]]":
+        """
+        Sends a prompt_user request.
+
+        :param arguments: The positional arguments of prompt_user.
+        :return: Future of the answer.
+        """
+        future: _Future[tuple[str | None, bool]] = _Future()
+        with self._lock:  # Also keeps the messages of different threads from interleaving
+            if self.closed:
+                raise ConnectionError("The connection to the prompt service is closed")
+            request_id: int = self._next_id
+            self._next_id += 1
+            self._futures[request_id] = future
+            try:
+                self._conn.send((request_id, arguments))
+            except OSError:
+                del self._futures[request_id]
+                raise
+        return future
+
+    def _read_loop(self) -> None:
+        while True:
+            try:
+                request_id, answer, error = self._conn.recv()
+            except (EOFError, OSError):
+                break
+            with self._lock:
+                future: _Future[tuple[str | None, bool]] | None = self._futures.pop(request_id, None)
+            if future is None or not future.set_running_or_notify_cancel():
+                continue
+            if error is not None:
+                future.set_exception(RuntimeError(error))
+            else:
+                future.set_result(answer)
+        with self._lock:
+            self.closed = True
+            futures, self._futures = self._futures, {}
+        for future in futures.values():
+            if future.set_running_or_notify_cancel():
+                future.set_exception(ConnectionError("The prompt service closed the connection"))
+        self._conn.close()
+
+class _SuppressionStore:
+    """
+    Set of the prompts the user does not want to see again. Messages are kept as 16 byte blake2b fingerprints
+    in memory and in a file of concatenated fingerprints under config.base_app_dir. The file is read on first
+    use, new fingerprints are appended in batches (and at exit). Without a base_app_dir it only lives in memory.
+    """
+    FINGERPRINT_SIZE: int = 16
+    FILE_NAME: str = "do_not_show_again.bin"
+
+    def __init__(self, batch_size: int = 32, flush_interval: float = 5.0) -> None:
+        """
+        Initialize the store.
+
+        :param batch_size: Number of new fingerprints that causes a write.
+        :param flush_interval: Seconds after which new fingerprints get written on the next add.
+        """
+        self.batch_size: int = batch_size
+        self.flush_interval: float = flush_interval
+        self._fingerprints: set[bytes] = set()
+        self._pending: list[bytes] = []
+        self._last_write: float = time.monotonic()
+        self._filepath: str | None = None
+        self._loaded: bool = False
+        self._atexit_registered: bool = False
+        self._lock: threading.Lock = threading.Lock()
+
+    @classmethod
+    def fingerprint(cls, message: str) -> bytes:
+        """
+        Returns the fingerprint of a message.
+
+        :param message: The message.
+        :return: The fingerprint.
+        """
+        return _hashlib.blake2b(message.encode("utf-8", "surrogatepass"), digest_size=cls.FINGERPRINT_SIZE).digest()
+
+    def _ensure_loaded(self) -> None:
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._load()
+                    self._loaded = True  # Set afterward, so lock-free readers never see a partial set
+
+    def _load(self) -> None:
+        """Reads the stored fingerprints, the caller has to hold the lock."""
+        base_app_dir: str | None = getattr(config, "base_app_dir", None)
+        if not base_app_dir:
+            return
+        self._filepath = os.path.join(base_app_dir, self.FILE_NAME)
+        try:
+            with open(self._filepath, "rb") as f:
+                data: bytes = f.read()
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            print(f"Could not read {self._filepath}: {e}", file=_sys.__stderr__)
+            self._filepath = None
+            return
+        size: int = self.FINGERPRINT_SIZE
+        valid: int = len(data) - len(data) % size
+        self._fingerprints.update(data[i:i + size] for i in range(0, valid, size))
+        if valid != len(data):  # Cut off a partially written fingerprint, so appends stay aligned
+            with open(self._filepath, "r+b") as f:
+                f.truncate(valid)
+
+    def _write(self) -> None:
+        """Appends the pending fingerprints, the caller has to hold the lock."""
+        pending, self._pending = self._pending, []
+        self._last_write = time.monotonic()
+        if not pending or self._filepath is None:
+            return
+        try:
+            with open(self._filepath, "ab") as f:
+                f.write(b"".join(pending))
+        except OSError as e:
+            print(f"Could not write {self._filepath}: {e}", file=_sys.__stderr__)
+
+    def add(self, message: str) -> None:
+        """
+        Adds a message to the store.
+
+        :param message: The message.
+        """
+        fingerprint: bytes = self.fingerprint(message)
+        self._ensure_loaded()
+        with self._lock:
+            if fingerprint in self._fingerprints:
+                return
+            self._fingerprints.add(fingerprint)
+            if self._filepath is None:
+                return
+            if not self._pending and not self._atexit_registered:
+                atexit.register(self.flush)
+                self._atexit_registered = True
+            self._pending.append(fingerprint)
+            if (len(self._pending) >= self.batch_size
+                    or time.monotonic() - self._last_write >= self.flush_interval):
+                self._write()
+
+    def flush(self) -> None:
+        """Writes all pending fingerprints."""
+        with self._lock:
+            self._write()
+
+    def _after_fork_in_child(self) -> None:
+        """The pending fingerprints get written by the parent."""
+        self._lock = threading.Lock()
+        self._pending = []
+
+    def __contains__(self, message: str) -> bool:
+        self._ensure_loaded()
+        return self.fingerprint(message) in self._fingerprints
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self._fingerprints)
+
+# Copyright zScout  TODO: Refactor, title etc are just wrongly ordered in the methods and adding support for custom icons
 class IOManager(metaclass=SingletonMeta):
     """TBA"""
-    _do_not_show_again: OrderedSet[str] = OrderedSet()
+    _do_not_show_again: _SuppressionStore = _SuppressionStore()
     _currently_displayed: OrderedSet[str] = OrderedSet()
     _button_display_callable: StaticContainer[_ty.Callable] = StaticContainer()
     _is_indev: StaticContainer[bool] = StaticContainer()
-    _popup_queue: _ty.List[_ty.Callable[[_ty.Any], _ty.Any]] = []
+    _popup_queue: _PromptQueue = _PromptQueue()
+    _level_mask: int = sum(_IO_LEVEL_BITS.values())  # Bits of the enabled levels, see set_logging_level
+    _prompt_wakeup: _ty.Callable[[], None] | None = None
+    _invoking_prompts: bool = False
+    _prompt_service: _ConnectionServer | None = None
+    _prompt_send_lock: threading.Lock = threading.Lock()
+    _prompt_client: _PromptClient | None = None
+    _prompt_client_lock: threading.Lock = threading.Lock()
 
     _logger: ActLogger
+    _io_logger: NamespaceLogger  # Namespace "dancer.io", its level decides which messages get handled
 
     def add_handler(self, handler) -> None:
         self._logger.add_handler(handler)
@@ -407,32 +2557,92 @@ class IOManager(metaclass=SingletonMeta):
         """
         return len(self._popup_queue) > 0
 
+    def set_prompt_wakeup(self, wakeup: _ty.Callable[[], None] | None) -> None:
+        """
+        Sets a callable that gets invoked, from the thread that queued the prompt, as soon as a prompt is waiting.
+        It should schedule invoke_prompts on the UI thread (e.g. by emitting a queued Qt signal) and must not
+        block. Polling invoke_prompts keeps working regardless.
+
+        :param wakeup: The callable or None to remove it.
+        :return: None
+        """
+        self._prompt_wakeup = wakeup
+        if wakeup is not None and self._popup_queue.rearm():
+            wakeup()
+
     def invoke_prompts(self) -> None:
         """
+        Shows the next queued prompt, has to be called from the UI thread.
+        If a wakeup is set and more prompts are queued afterward, it gets invoked again.
 
         :return:
         """
-        if not self.has_cached_errors():
+        if self._invoking_prompts:  # Called from the event loop of the prompt that is currently shown
             return
+        overflow: int = self._popup_queue.take_overflow()
+        if overflow:
+            self._io_logger.warning(f"{overflow} prompt(s) were dropped because too many were queued")
 
-        popup_callable: _ty.Callable = self._popup_queue[0]
-        self._popup_queue.pop(0)
-
-        popup_callable()
+        entry: _QueuedPrompt | _PromptRequest | None = self._popup_queue.pop()
+        if entry is not None:
+            self._invoking_prompts = True
+            try:
+                if isinstance(entry, _PromptRequest):
+                    self._answer_request(entry)
+                else:
+                    title: str = entry.title if entry.count == 1 else f"{entry.title} ({entry.count}x)"
+                    self._show_prompt(title, entry.text, entry.description, entry.level, entry.custom_options)
+            finally:
+                self._invoking_prompts = False
+        if self._popup_queue.rearm():
+            self._wake_prompt_consumer()
+
+    def _wake_prompt_consumer(self) -> None:
+        wakeup: _ty.Callable[[], None] | None = self._prompt_wakeup
+        if wakeup is not None:
+            wakeup()
+
+    def _answer_request(self, request: _PromptRequest) -> None:
+        """
+        Shows the prompt of a prompt_user request and resolves its future.
+
+        :param request: The request.
+        :return: None
+        """
+        if not request.future.set_running_or_notify_cancel():  # Cancelled by the caller
+            return
+        try:
+            if not self._button_display_callable.has_value():
+                raise RuntimeError("The IOManager has no prompt creation callable, call init first")
+            popup_creation_callable: _ty.Callable = self._button_display_callable.get_value()
+            answer: tuple[str | None, bool] = popup_creation_callable(request.title, request.text,
+                                                                      request.description, request.level,
+                                                                      request.options, request.default_option,
+                                                                      request.checkbox_label)
+        except Exception as e:
+            request.future.set_exception(e)
+        else:
+            request.future.set_result(answer)
 
-    def init(self, promt_creation_callable: _ty.Callable, logs_folder_path: str, is_indev: bool) -> None:
+    def init(self, promt_creation_callable: _ty.Callable, logs_folder_path: str, is_indev: bool,
+             logger_options: dict[str, _ty.Any] | None = None) -> None:
         """
         Initializes the ErrorCache with a popup creation callable and development mode flag.
         :param promt_creation_callable: Callable used to create popups.
         :param logs_folder_path: File path to the logs folder.
         :param is_indev: Boolean indicating whether the application is in development mode.
+        :param logger_options: Additional keyword arguments for the ActLogger, e.g. {"async_mode": True}.
         :return: None
         """
         self._button_display_callable.set_value(promt_creation_callable)
         self._order_logs(logs_folder_path)
-        self._logger = ActLogger(log_to_file=True, filepath=os.path.join(logs_folder_path, "latest.log"))
+        self._logger = ActLogger(log_to_file=True, filepath=os.path.join(logs_folder_path, "latest.log"),
+                                 **(logger_options or {}))
         sys.stdout = self._logger.create_pipe_redirect(sys.stdout, level=logging.DEBUG)
         sys.stderr = self._logger.create_pipe_redirect(sys.stderr, level=logging.ERROR)
+        self._io_logger = self._logger.get_logger("dancer.io")
+        self._logger.add_level_listener(self._update_level_mask)
+        self._update_level_mask()
         # Replace fancy characters
         self._is_indev.set_value(is_indev)
 
@@ -442,21 +2652,35 @@ class IOManager(metaclass=SingletonMeta):
         :param level: Logging level to set to.
         :return: None
         """
-        self._logger.setLevel(level)
+        self._logger.setLevel(level)  # Updates the level mask through the level listener
+
+    def _update_level_mask(self) -> None:
+        level: int = self._io_logger.effective_level
+        self._level_mask = sum(bit for lvl, bit in _IO_LEVEL_BITS.items() if lvl >= level)
 
     def get_logging_level(self) -> int:
         return self._logger.logging_level
 
     @staticmethod
-    def _order_logs(directory: str) -> None:
-        logs_dir = PLPath(directory)
-        to_log_file = logs_dir / "latest.log"
-
-        if not to_log_file.exists():
-            print("Logfile missing")
-            return
-
-        with open(to_log_file, "rb") as f:
+    def _read_log_dates(log_file: PLPath) -> tuple[str, str] | None:
+        """
+        Reads the dates of the first and last record of a text or structured log file.
+        :param log_file: The log file to read.
+        :return: The dates as YYYY-MM-DD or None if the file is malformed.
+        """
+        with open(log_file, "rb") as f:
+            head: bytes = f.read(len(_BINARY_LOG_MAGIC))
+        if head == _BINARY_LOG_MAGIC or head.startswith(b"{"):
+            try:
+                with StructuredLogReader(log_file) as reader:
+                    first, last = reader.first(), reader.last()
+            except (ValueError, OSError, _struct.error):
+                return None
+            if first is None or last is None:
+                return None
+            return first.datetime.strftime("%Y-%m-%d"), last.datetime.strftime("%Y-%m-%d")
+
+        with open(log_file, "rb") as f:
             # (solution from https://stackoverflow.com/questions/46258499/how-to-read-the-last-line-of-a-file-in-python)
             first_line = f.readline().decode()
             try:  # catch OSError in case of a one line file
@@ -472,35 +2696,44 @@ class IOManager(metaclass=SingletonMeta):
             start_date = re.search(date_pattern, first_line).group(1)  # type: ignore
             end_date = re.search(date_pattern, last_line).group(1)  # type: ignore
         except AttributeError:
+            return None
+        return start_date, end_date
+
+    @staticmethod
+    def _order_logs(directory: str) -> None:
+        logs_dir = PLPath(directory)
+        to_log_file = logs_dir / "latest.log"
+
+        if not to_log_file.exists():
+            print("Logfile missing")
+            return
+
+        dates: tuple[str, str] | None = IOManager._read_log_dates(to_log_file)
+        if dates is None:
             print("Removing malformed latest.log")
             os.remove(to_log_file)
             return
+        start_date, end_date = dates
 
         date_name = f"{start_date}_{end_date}"
-        date_logs = list(logs_dir.rglob(f"{date_name}*.log"))
-
-        if not date_logs:
-            new_log_file_name = logs_dir / f"{date_name}.log"
-        else:
-            try:
-                max_num = max(
-                    (int(re.search(r"#(\d+)$", p.stem).group(1)) for p in date_logs if  # type: ignore
-                     re.search(r"#(\d+)$", p.stem)),
-                    default=0
-                )
-            except AttributeError:
-                print("AttribError")
-                return
-            max_num += 1
-            base_log_file = logs_dir / f"{date_name}.log"
-            if base_log_file.exists():
-                os.rename(base_log_file, logs_dir / f"{date_name}#{max_num}.log")
-                max_num += 1
-            new_log_file_name = logs_dir / f"{date_name}#{max_num}.log"
-
+        new_log_file_name = _next_log_segment_path(logs_dir, date_name)
         os.rename(to_log_file, new_log_file_name)
         print(f"Renamed latest.log to {new_log_file_name}")
 
+    @staticmethod
+    def _build_message(log_message: str | _ty.Callable[[], str], args: tuple[_ty.Any, ...]) -> str:
+        """
+        Resolves a deferred log message, only called once the level is known to be enabled.
+        :param log_message: The message, a %-style format string or a callable returning the message.
+        :param args: Arguments merged into the message with the % operator.
+        :return: The final message.
+        """
+        if callable(log_message):
+            log_message = log_message()
+        if args:
+            log_message = log_message % args
+        return log_message
+
     def _show_prompt(self, title: str, text: str, description: str,
                      level: _ty.Literal["debug", "information", "question", "warning", "error"],
                      custom_options: _ty.Dict[str, _ty.Callable] | None = None) -> None:
@@ -512,18 +2745,19 @@ class IOManager(metaclass=SingletonMeta):
         :param level: Type of icon to display in the dialog box.
         :return: None
         """
-        if text in self._currently_displayed:
+        template: str = normalize_message(text)  # Messages that only differ in numbers, paths, ... count as one
+        if template in self._currently_displayed:
             # Error is currently displayed
             return
 
-        if text in self._do_not_show_again:
+        if template in self._do_not_show_again:
             # Error should not be displayed again
             return
 
         if not self._button_display_callable.has_value():
             return
 
-        self._currently_displayed.add(text)
+        self._currently_displayed.add(template)
 
         checkbox_text: str = "Do not show again"
         options_list: _ty.List[str] = ["Ok"]
@@ -539,8 +2773,8 @@ class IOManager(metaclass=SingletonMeta):
                                                                         options_list, default_option, checkbox_text)
 
         if popup_return[1]:
-            self._do_not_show_again.add(text)
-        self._currently_displayed.remove(text)
+            self._do_not_show_again.add(template)
+        self._currently_displayed.remove(template)
 
         # invoke button commands
         option_name: str = popup_return[0]
@@ -563,13 +2797,15 @@ class IOManager(metaclass=SingletonMeta):
         if not show_prompt:
             return
 
-        self._popup_queue.append(lambda: self._show_prompt(title, log_message, description, level, custom_options))
+        if self._popup_queue.put(title, log_message, description, level, custom_options):
+            self._wake_prompt_consumer()
 
     # "Errors"
 
-    def warn(self, log_message: str, description: str = "", show_prompt: bool = False,
+    def warn(self, log_message: str | _ty.Callable[[], str], description: str = "", show_prompt: bool = False,
              print_log: bool = True, prompt_title: str | None = None,
-             custom_options: _ty.Dict[str, _ty.Callable] | None = None) -> None:
+             custom_options: _ty.Dict[str, _ty.Callable] | None = None, *,
+             args: tuple[_ty.Any, ...] = ()) -> None:
         """
         Logs a warning message and optionally displays a warning dialog.
         :param prompt_title: Sets the popup window title
@@ -578,13 +2814,15 @@ class IOManager(metaclass=SingletonMeta):
         :param description: Additional description of the warning.
         :param show_prompt: Whether to show a dialog for the warning.
         :param print_log: Whether to print the log message.
+        :param args: %-style arguments for the log message, only merged if the level is enabled.
         :return: None
         """
-        return self.warning(log_message, description, show_prompt, print_log, prompt_title, custom_options)
+        return self.warning(log_message, description, show_prompt, print_log, prompt_title, custom_options, args=args)
 
-    def info(self, log_message: str, description: str = "", show_prompt: bool = False,
+    def info(self, log_message: str | _ty.Callable[[], str], description: str = "", show_prompt: bool = False,
              print_log: bool = True, prompt_title: str | None = None,
-             custom_options: _ty.Dict[str, _ty.Callable] | None = None) -> None:
+             custom_options: _ty.Dict[str, _ty.Callable] | None = None, *,
+             args: tuple[_ty.Any, ...] = ()) -> None:
         """
         Logs an informational message and optionally displays an information dialog.
         :param log_message: The informational message to log.
@@ -593,23 +2831,25 @@ class IOManager(metaclass=SingletonMeta):
         :param print_log: Whether to print the log message.
         :param prompt_title: Sets the popup window title
         :param custom_options: Defines additional buttons for the popup window
+        :param args: %-style arguments for the log message, only merged if the level is enabled.
         :return: None
         """
+        if not self._level_mask & _IO_LEVEL_BITS[INFO]:
+            return
         title: str = "Information"
         if prompt_title is not None:
             title += f": {prompt_title}"
 
+        message: str = self._build_message(log_message, args)
         if print_log:
-            self._logger.info(f"{log_message} {f'({description})' if description else ''}")
+            self._io_logger.info(f"{message} {f'({description})' if description else ''}")
 
-        if ActLogger().logging_level > INFO:
-            return
-
-        self._handle_prompt(show_prompt, title, log_message, description, "information", custom_options)
+        self._handle_prompt(show_prompt, title, message, description, "information", custom_options)
 
-    def warning(self, log_message: str, description: str = "", show_prompt: bool = False,
+    def warning(self, log_message: str | _ty.Callable[[], str], description: str = "", show_prompt: bool = False,
                 print_log: bool = True, prompt_title: str | None = None,
-                custom_options: _ty.Dict[str, _ty.Callable] | None = None) -> None:
+                custom_options: _ty.Dict[str, _ty.Callable] | None = None, *,
+                args: tuple[_ty.Any, ...] = ()) -> None:
         """
         Logs a warning message and optionally displays a warning dialog.
         :param log_message: The warning message to log.
@@ -618,23 +2858,25 @@ class IOManager(metaclass=SingletonMeta):
         :param print_log: Whether to print the log message.
         :param prompt_title: Sets the popup window title
         :param custom_options: Defines additional buttons for the popup window
+        :param args: %-style arguments for the log message, only merged if the level is enabled.
         :return: None
         """
+        if not self._level_mask & _IO_LEVEL_BITS[WARNING]:
+            return
         title: str = "Warning"
         if prompt_title is not None:
             title += f": {prompt_title}"
 
+        message: str = self._build_message(log_message, args)
         if print_log:
-            self._logger.warning(f"{log_message} {f'({description})' if description else ''}")
-
-        if ActLogger().logging_level > WARNING:
-            return
+            self._io_logger.warning(f"{message} {f'({description})' if description else ''}")
 
-        self._handle_prompt(show_prompt, title, log_message, description, "warning", custom_options)
+        self._handle_prompt(show_prompt, title, message, description, "warning", custom_options)
 
-    def fatal_error(self, log_message: str, description: str = "", show_prompt: bool = False,
+    def fatal_error(self, log_message: str | _ty.Callable[[], str], description: str = "", show_prompt: bool = False,
                     print_log: bool = True, prompt_title: str | None = None,
-                    custom_options: _ty.Dict[str, _ty.Callable] | None = None) -> None:
+                    custom_options: _ty.Dict[str, _ty.Callable] | None = None, *,
+                    args: tuple[_ty.Any, ...] = ()) -> None:
         """
         Logs a fatal error message and optionally displays an error dialog.
         :param log_message: The error message to log.
@@ -643,14 +2885,16 @@ class IOManager(metaclass=SingletonMeta):
         :param print_log: Whether to print the log message.
         :param prompt_title: Sets the popup window title
         :param custom_options: Defines additional buttons for the popup window
+        :param args: %-style arguments for the log message, only merged if the level is enabled.
         :return: None
         """
-        self.error(log_message, description, show_prompt, print_log, prompt_title, custom_options, error_severity="FATAL")
+        self.error(log_message, description, show_prompt, print_log, prompt_title, custom_options,
+                   error_severity="FATAL", args=args)
 
-    def error(self, log_message: str, description: str = "", show_prompt: bool = False,
+    def error(self, log_message: str | _ty.Callable[[], str], description: str = "", show_prompt: bool = False,
               print_log: bool = True, prompt_title: str | None = None,
               custom_options: _ty.Dict[str, _ty.Callable] | None = None, *_,
-              error_severity: str = "NORMAL") -> None:
+              error_severity: str = "NORMAL", args: tuple[_ty.Any, ...] = ()) -> None:
         """
         Logs an error message and optionally displays an error dialog.
         :param log_message: The error message to log.
@@ -660,23 +2904,25 @@ class IOManager(metaclass=SingletonMeta):
         :param prompt_title: Sets the popup window title
         :param custom_options: Defines additional buttons for the popup window
         :param error_severity: Defined a custom error name.
+        :param args: %-style arguments for the log message, only merged if the level is enabled.
         :return: None
         """
+        if not self._level_mask & _IO_LEVEL_BITS[ERROR]:
+            return
         title: str = f"{str(error_severity).capitalize()} Error"
         if prompt_title is not None:
             title += f": {prompt_title}"
 
+        message: str = self._build_message(log_message, args)
         if print_log:
-            self._logger.error(f"{str(error_severity)}: {log_message} {f'({description})' if description else ''}")
-
-        if ActLogger().logging_level > ERROR:
-            return
+            self._io_logger.error(f"{str(error_severity)}: {message} {f'({description})' if description else ''}")
 
-        self._handle_prompt(show_prompt, title, log_message, description, "error", custom_options)
+        self._handle_prompt(show_prompt, title, message, description, "error", custom_options)
 
-    def debug(self, log_message: str, description: str = "", show_prompt: bool = False,
+    def debug(self, log_message: str | _ty.Callable[[], str], description: str = "", show_prompt: bool = False,
               print_log: bool = True, prompt_title: str | None = None,
-              custom_options: _ty.Dict[str, _ty.Callable] | None = None) -> None:
+              custom_options: _ty.Dict[str, _ty.Callable] | None = None, *,
+              args: tuple[_ty.Any, ...] = ()) -> None:
         """
         Logs a debug message and optionally displays a debug dialog, only if in development mode.
         :param log_message: The debug message to log.
@@ -685,8 +2931,11 @@ class IOManager(metaclass=SingletonMeta):
         :param print_log: Whether to print the log message.
         :param prompt_title: Sets the popup window title
         :param custom_options: Defines additional buttons for the popup window
+        :param args: %-style arguments for the log message, only merged if the level is enabled.
         :return: None
         """
+        if not self._level_mask & _IO_LEVEL_BITS[DEBUG]:
+            return
         if not self._is_indev.has_value():
             return
 
@@ -698,24 +2947,115 @@ class IOManager(metaclass=SingletonMeta):
         if prompt_title is not None:
             title += f": {prompt_title}"
 
+        message: str = self._build_message(log_message, args)
         if print_log:
-            self._logger.debug(f"{log_message} {f'({description})' if description else ''}")
+            self._io_logger.debug(f"{message} {f'({description})' if description else ''}")
 
-        if ActLogger().logging_level > DEBUG:
-            return
-
-        self._handle_prompt(show_prompt, title, log_message, description, "debug", custom_options)
+        self._handle_prompt(show_prompt, title, message, description, "debug", custom_options)
 
     def prompt_user(self, title: str, message: str, details: str,
                     level: _ty.Literal["debug", "information", "question", "warning", "error"],
                     options: list[str], default_option: str, checkbox_label: str | None = None,
-                    return_type: _ty.Literal["thread", "proc"] = "thread"):  # -> tuple[SafeList, Event]:
-        raise NotImplementedError("The current implementation does not support user prompting with arbitrary data.")
+                    return_type: _ty.Literal["thread", "proc"] = "thread") -> "_Future[tuple[str | None, bool]]":
+        """
+        Asks the user something without blocking. The prompt is shown by the UI thread the next time it invokes
+        the prompts (right away if a wakeup is set, see set_prompt_wakeup). Never wait on the future from the UI
+        thread, asyncio code can await it through asyncio.wrap_future.
+        :param title: Title of the prompt.
+        :param message: Text of the prompt.
+        :param details: Additional description text.
+        :param level: Type of icon to display in the prompt.
+        :param options: The buttons of the prompt.
+        :param default_option: The default button.
+        :param checkbox_label: Text of an optional checkbox.
+        :param return_type: "thread" shows the prompt in this process, "proc" sends it to the prompt service of
+                            the UI process (see start_prompt_service), which is what child processes use.
+        :return: Future of the chosen option (None if the prompt was closed) and the checkbox state.
+        """
+        if return_type == "proc":
+            return self._get_prompt_client().request((title, message, details, level, options, default_option,
+                                                      checkbox_label))
+        future: _Future[tuple[str | None, bool]] = _Future()
+        request: _PromptRequest = _PromptRequest(title, message, details, level, list(options), default_option,
+                                                 checkbox_label, future)
+        if self._popup_queue.put_request(request):
+            self._wake_prompt_consumer()
+        return future
+
+    def _get_prompt_client(self) -> _PromptClient:
+        with self._prompt_client_lock:
+            client: _PromptClient | None = self._prompt_client
+            if client is None or client.closed or client.pid != os.getpid():  # Not inherited through a fork
+                address: str | None = os.environ.get(_PROMPT_SERVICE_ENV_VAR)
+                if address is None:
+                    raise RuntimeError("No prompt service is running, call start_prompt_service in the UI process")
+                client = self._prompt_client = _PromptClient(address)
+        return client
+
+    def start_prompt_service(self) -> _ty.Any:
+        """
+        Lets other processes call prompt_user(..., return_type="proc"). The address is stored in the
+        DANCER_PROMPT_SERVICE environment variable, so child processes started through multiprocessing
+        afterwards find it, they also share the authkey.
+        :return: The address of the prompt service.
+        """
+        if self._prompt_service is None:
+            self._prompt_service = _ConnectionServer(self._on_remote_prompt, "IOManagerPrompt")
+            os.environ[_PROMPT_SERVICE_ENV_VAR] = str(self._prompt_service.address)
+        return self._prompt_service.address
+
+    def stop_prompt_service(self) -> None:
+        """Stops accepting new connections to the prompt service."""
+        if self._prompt_service is not None:
+            self._prompt_service.close()
+            self._prompt_service = None
+            os.environ.pop(_PROMPT_SERVICE_ENV_VAR, None)
+
+    def _on_remote_prompt(self, conn: _Connection, message: tuple[int, tuple[_ty.Any, ...]]) -> None:
+        request_id, arguments = message
+        send_lock: threading.Lock = self._prompt_send_lock
+
+        def _reply(future: _Future[tuple[str | None, bool]]) -> None:
+            answer: tuple[str | None, bool] | None = None
+            error: str | None = None
+            try:
+                answer = future.result()
+            except BaseException as e:
+                error = f"{type(e).__name__}: {e}"
+            with send_lock:
+                try:
+                    conn.send((request_id, answer, error))
+                except OSError:  # The child is gone
+                    pass
+        self.prompt_user(*arguments).add_done_callback(_reply)
+
+    def _restore_pipes(self) -> None:
+        if hasattr(self, "_logger"):
+            if isinstance(sys.stdout, _StreamToLogger):
+                sys.stdout = self._logger.restore_pipe(sys.stdout)
+            if isinstance(sys.stderr, _StreamToLogger):
+                sys.stderr = self._logger.restore_pipe(sys.stderr)
+
+    def _after_fork_in_child(self) -> None:
+        """
+        Called in the child after a fork. Restores stdout and stderr and resets the prompt state shared by the
+        class, the prompt service and the UI callables stay with the parent.
+        """
+        for stream in (sys.stdout, sys.stderr):
+            if isinstance(stream, _StreamToLogger):
+                stream._reset_buffers()  # The partial lines are written by the parent
+        self._restore_pipes()
+        cls: type[IOManager] = type(self)
+        cls._currently_displayed = OrderedSet()
+        cls._button_display_callable = StaticContainer()
+        cls._is_indev = StaticContainer()
+        cls._popup_queue = _PromptQueue()
+        cls._prompt_send_lock = threading.Lock()
+        cls._prompt_client_lock = threading.Lock()
+        cls._do_not_show_again._after_fork_in_child()
 
     def __del__(self) -> None:
-        if hasattr(self, "_logger"):
-            sys.stdout = self._logger.restore_pipe(sys.stdout)
-            sys.stderr = self._logger.restore_pipe(sys.stderr)
+        self._restore_pipes()
 
 class SystemTheme(_Enum):
     """Used to make system theme information standardized"""
@@ -155,6 +155,22 @@ class QtTimidTimer(_QObject):
         return index in self._timers and self._timers[index] is not None and self._timers[index].isActive()
 
 
+class _QtPromptWakeup(_QObject):
+    """
+    Wakes the UI thread up when the IOManager queued a prompt. requested may be emitted from any thread, the
+    queued connection runs the callback on the thread this object lives in.
+    """
+    requested = _Signal()
+
+    def __init__(self, callback: _ty.Callable[[], None], parent: _QObject | None = None) -> None:
+        super().__init__(parent)
+        self._callback: _ty.Callable[[], None] = callback
+        self.requested.connect(self._on_requested, _Qt.ConnectionType.QueuedConnection)
+
+    def _on_requested(self) -> None:
+        self._callback()
+
+
 class QtAppSettings(_QObject):
     _instance: _ty.Self | None = None
     _initialized: bool = False
@@ -261,6 +277,13 @@ class BasicAppGUIQt(_DefaultGUIApp):
             self.timer_number: int = 1
             self.timer: QtTimidTimer = QtTimidTimer()
             self.timer.timeout.connect(self.timer_tick)
+            # Single shot timer that keeps collecting between the 500ms ticks while finished tasks are left over
+            self.collection_timer: _QTimer = _QTimer()
+            self.collection_timer.setSingleShot(True)
+            self.collection_timer.timeout.connect(self._collect_backlog)
+            # Show prompts queued by other threads right away instead of on the next timer tick
+            self.prompt_wakeup: _QtPromptWakeup = _QtPromptWakeup(self.io_manager.invoke_prompts)
+            self.io_manager.set_prompt_wakeup(self.prompt_wakeup.requested.emit)
         except Exception as e:
             raise Exception("Exception occurred during initialization of the Main class") from e
 
@@ -311,6 +334,16 @@ class BasicAppGUIQt(_DefaultGUIApp):
             self.timer_number += 1
             if self.timer_number > 999:
                 self.timer_number = 1
+            self._schedule_collection()
+
+    def _schedule_collection(self) -> None:
+        """Collects again as soon as the event loop is idle if the time budget did not suffice for the backlog."""
+        if self.collection_backlog and not self.collection_timer.isActive():
+            self.collection_timer.start(0)
+
+    def _collect_backlog(self) -> None:
+        self.collect_tasks()
+        self._schedule_collection()
 
     def exec(self) -> int:
         self.timer.start(500, 0)
@@ -340,8 +373,12 @@ class BasicAppGUIQt(_DefaultGUIApp):
     def close(self) -> None:
         """Cleans up resources"""
         super().close()
+        if hasattr(self, "prompt_wakeup"):
+            self.io_manager.set_prompt_wakeup(None)
         if hasattr(self, "timer"):
             self.timer.stop_all()
+        if hasattr(self, "collection_timer"):
+            self.collection_timer.stop()
         if hasattr(self, "qapp"):
             if self.qapp is not None:
                 instance = self.qapp.instance()
@@ -0,0 +1,44 @@
+import logging
+import sys
+import os
+
+import pytest
+
+from dancer.io import ActLogger, SingletonMeta
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+
+
+def test_forked_child_gets_redirected_streams_back(tmp_path) -> None:
+    logger = ActLogger(log_to_file=True, filepath=str(tmp_path / "latest.log"))
+    original_stdout, original_stderr = sys.stdout, sys.stderr
+    read_fd, write_fd = os.pipe()
+    try:
+        logger.handlers[0].setLevel(logging.CRITICAL + 1)  # The console handler
+        # Like DefaultAppTUI, print and stderr output goes to the logger
+        sys.stdout = logger.create_pipe_redirect(sys.__stdout__, level=logging.DEBUG)
+        sys.stderr = logger.create_pipe_redirect(sys.__stderr__, level=logging.ERROR)
+        pid = os.fork()
+        if pid == 0:  # The child has no handlers anymore, its output has to reach its own stdout and stderr
+            try:
+                os.dup2(write_fd, 1)
+                os.dup2(write_fd, 2)
+                print("child stdout")
+                sys.stderr.write("child stderr\n")
+                sys.stdout.flush()
+                sys.stderr.flush()
+            finally:
+                os._exit(0)
+        os.close(write_fd)
+        _, status = os.waitpid(pid, 0)
+        logger.restore_pipe(sys.stdout)
+        logger.restore_pipe(sys.stderr)
+    finally:
+        sys.stdout, sys.stderr = original_stdout, original_stderr
+        logger.close()
+        SingletonMeta._instances.pop(ActLogger, None)
+
+    with os.fdopen(read_fd, "rb") as child_output:
+        assert child_output.read() == b"child stdout\nchild stderr\n"
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert "child" not in (tmp_path / "latest.log").read_text()  # Nothing got written twice through the parent
@@ -0,0 +1,54 @@
+import multiprocessing
+import logging
+import time
+import re
+
+from dancer.io import ActLogger, SingletonMeta
+
+PROCESSES: int = 8
+RECORDS_PER_SECOND: int = 20000
+SECONDS: float = 1.0
+
+
+def _child(address, records: int) -> None:
+    logger = ActLogger(collector_address=address)
+    logger.setLevel(logging.DEBUG)
+    batch: int = RECORDS_PER_SECOND // 100
+    start: float = time.monotonic()
+    for i in range(records):
+        logger.info("child record %d of %d end", i, records)
+        if i % batch == batch - 1:  # Pace the records at RECORDS_PER_SECOND
+            delay: float = start + (i + 1) / RECORDS_PER_SECOND - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+    logger.close()
+
+
+def test_collector_loses_and_tears_no_lines(tmp_path) -> None:
+    filepath = tmp_path / "collected.log"
+    logger = ActLogger(log_to_file=True, filepath=str(filepath), file_buffer_size=1 << 16)
+    try:
+        logger.handlers[0].setLevel(logging.CRITICAL + 1)  # The console handler
+        address = logger.start_collector()
+        records: int = int(RECORDS_PER_SECOND * SECONDS)
+        context = multiprocessing.get_context("spawn")
+        processes = [context.Process(target=_child, args=(address, records)) for _ in range(PROCESSES)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(60)
+        assert all(process.exitcode == 0 for process in processes)
+        logger.close()
+    finally:
+        logger.close()
+        SingletonMeta._instances.pop(ActLogger, None)
+
+    pattern = re.compile(r"\[[^]]+\] \[INFO\] \[(\d+)\] child record (\d+) of (\d+) end")
+    next_index: dict[int, int] = {process.pid: 0 for process in processes}
+    for line in filepath.read_text().splitlines():
+        match = pattern.fullmatch(line)
+        assert match is not None, f"Torn line: {line!r}"
+        pid, index = int(match.group(1)), int(match.group(2))
+        assert index == next_index[pid]  # Nothing lost and in order per process
+        next_index[pid] += 1
+    assert all(count == records for count in next_index.values())
@@ -0,0 +1,59 @@
+import threading
+import logging
+import sys
+
+from dancer.io import _StreamToLogger
+
+
+class _RecordingLogger:
+    """Stands in for the ActLogger, collects the lines a _StreamToLogger passes on."""
+    def __init__(self) -> None:
+        self.lines: list[str] = []
+        self._lock = threading.Lock()
+
+    def isEnabledFor(self, level: int) -> bool:
+        return True
+
+    def log(self, level: int, message: str) -> None:
+        with self._lock:
+            self.lines.append(message)
+
+
+def test_concurrent_writes_do_not_tear_lines() -> None:
+    logger = _RecordingLogger()
+    stream = _StreamToLogger(logger, logging.INFO, sys.__stdout__)
+    threads, lines_per_thread = 8, 5000
+    barrier = threading.Barrier(threads)
+
+    def writer(index: int) -> None:
+        barrier.wait()
+        for i in range(lines_per_thread):
+            # Like print, the line gets written in several pieces
+            stream.write(f"thread {index}")
+            stream.write(" ")
+            stream.write(f"line {i}")
+            stream.write("\n")
+
+    workers = [threading.Thread(target=writer, args=(n,)) for n in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    stream.flush_all()
+
+    assert len(logger.lines) == threads * lines_per_thread
+    expected = {f"thread {n} line {i}" for n in range(threads) for i in range(lines_per_thread)}
+    assert set(logger.lines) == expected
+
+
+def test_partial_line_of_finished_thread_is_not_continued() -> None:
+    logger = _RecordingLogger()
+    stream = _StreamToLogger(logger, logging.INFO, sys.__stdout__)
+
+    for text in ("dead partial ", "new thread line\n"):  # The second thread may get the ident of the first
+        thread = threading.Thread(target=stream.write, args=(text,))
+        thread.start()
+        thread.join()
+    stream.flush_all()
+
+    assert logger.lines == ["new thread line", "dead partial"]